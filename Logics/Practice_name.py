@@ -20,6 +20,9 @@ EXCEL_FILES_DIR = BACKEND_DIR / 'Excel Files'
 PRACTICE_IDS_API = 'https://provider-reference-v1.east.zocdoccloud.com/provider-reference/v1/practice/ids-by-monolith-ids~batchGet'
 PRACTICE_DETAILS_API = 'https://provider-reference-v1.east.zocdoccloud.com/provider-reference/v1/practice~batchGet'
 
+# Shared HTTP session so repeated API calls reuse the same connection
+HTTP_SESSION = requests.Session()
+
 
 def extract_manual_practice_ids(manual_practice_ids_string):
     """
@@ -171,7 +174,7 @@ def get_practice_info_from_api(practice_ids):
     }
     
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        response = HTTP_SESSION.post(url, headers=headers, json=data, timeout=30)
         response.raise_for_status()
         
         api_data = response.json()
@@ -263,7 +266,7 @@ def get_practice_details_from_api(cloud_ids):
     }
     
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        response = HTTP_SESSION.post(url, headers=headers, json=data, timeout=30)
         response.raise_for_status()
         
         api_data = response.json()
@@ -22,6 +22,9 @@ PROJECT_ROOT = LOGICS_DIR.parent
 BACKEND_DIR = PROJECT_ROOT / 'backend'
 EXCEL_FILES_DIR = BACKEND_DIR / 'Excel Files'
 
+# Shared HTTP session so repeated API calls reuse the same connection
+HTTP_SESSION = requests.Session()
+
 # Location-related column types
 LOCATION_TYPES = [
     'addressLine1',
@@ -907,7 +910,7 @@ def convert_to_cloud_ids(practice_ids):
     
     print("Fetching Practice Cloud IDs...")
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        response = HTTP_SESSION.post(url, headers=headers, json=data, timeout=30)
         
         cloud_id_map = {}
         reverse_map = {}  # cloud_id -> monolith_id
@@ -965,7 +968,7 @@ def get_monolith_ids_from_cloud_ids(cloud_ids, existing_reverse_map=None):
     data = {"practice_ids": cloud_ids_to_fetch}
     
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        response = HTTP_SESSION.post(url, headers=headers, json=data, timeout=30)
         if response.status_code == 200:
             result = response.json()
             locations = result.get('practice_locations', [])
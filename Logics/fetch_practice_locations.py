@@ -18,6 +18,9 @@ import sys
 PRACTICE_IDS_API = 'https://provider-reference-v1.east.zocdoccloud.com/provider-reference/v1/practice/ids-by-monolith-ids~batchGet'
 LOCATION_API = 'https://provider-reference-v1.east.zocdoccloud.com/provider-reference/v1/practice/location~batchGet'
 
+# Shared HTTP session so repeated API calls reuse the same connection
+HTTP_SESSION = requests.Session()
+
 # Location fields to fetch
 LOCATION_FIELDS = [
     'is_virtual', 'Location Type', 'address_1', 'address_2', 'address_3', 'city', 'state', 'zip',
@@ -53,7 +56,7 @@ def convert_to_cloud_ids(practice_ids):
     
     print("Fetching Practice Cloud IDs...")
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        response = HTTP_SESSION.post(url, headers=headers, json=data, timeout=30)
         
         cloud_id_map = {}
         if response.status_code == 200:
@@ -92,7 +95,7 @@ def fetch_location_details(cloud_id):
     data = {"practice_ids": [cloud_id]}
     
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        response = HTTP_SESSION.post(url, headers=headers, json=data, timeout=30)
         
         if response.status_code == 200:
             result = response.json()
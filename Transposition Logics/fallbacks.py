@@ -6,11 +6,13 @@ when the primary data source is empty or unavailable.
 """
 
 import os
+import sys
+import functools
+import importlib.util
 from pathlib import Path
 import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
-from openpyxl.utils import get_column_letter
 
 # Get the project root directory (parent of Transposition Logics folder)
 SCRIPT_DIR = Path(__file__).parent
@@ -18,189 +20,453 @@ PROJECT_ROOT = SCRIPT_DIR.parent
 BACKEND_DIR = PROJECT_ROOT / 'backend'
 EXCEL_FILES_DIR = BACKEND_DIR / 'Excel Files'
 
+# Highlight fills shared by all fallbacks (created once, reused for every cell)
+_FALLBACK_FILL = PatternFill(start_color="C1EAFF", end_color="C1EAFF", fill_type="solid")  # Blue for fallback cells
+_HIGHLIGHT_FILL = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")  # Yellow for too many values
+_GREEN_HEADER_FILL = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")  # Green for updated headers
 
-def apply_specialty_fallback_from_npi_extracts():
+# NPI Extracts columns consumed by the fallback logics below
+NPI_EXTRACTS_FIELDS = ('Specialty Derived', 'Suffix Derived', 'GENDER', 'LANGUAGES')
+
+# NPI Extracts columns holding ';' separated lists, pre-split in the lookup
+NPI_EXTRACTS_SPLIT_FIELDS = ('Specialty Derived', 'Suffix Derived')
+
+# Fallback names reported for each NPI Extracts field
+FALLBACK_NAMES = {
+    'Specialty Derived': 'Specialty Fallback',
+    'Suffix Derived': 'Professional Suffix Fallback',
+    'GENDER': 'Gender Fallback',
+    'LANGUAGES': 'Additional Languages Fallback',
+}
+
+# Provider header (lowercase) -> (NPI Extracts field, column position) filled by the fallbacks
+PROVIDER_FALLBACK_HEADERS = {
+    'specialty 1': ('Specialty Derived', 1),
+    'specialty 2': ('Specialty Derived', 2),
+    'specialty 3': ('Specialty Derived', 3),
+    'specialty 4': ('Specialty Derived', 4),
+    'specialty 5': ('Specialty Derived', 5),
+    'professional suffix 1': ('Suffix Derived', 1),
+    'professional suffix 2': ('Suffix Derived', 2),
+    'professional suffix 3': ('Suffix Derived', 3),
+    'gender': ('GENDER', 1),
+    'additional language spoken 1': ('LANGUAGES', 1),
+    'additional languages spoken 1': ('LANGUAGES', 1),
+    'additional language spoken 2': ('LANGUAGES', 2),
+    'additional languages spoken 2': ('LANGUAGES', 2),
+    'additional language spoken 3': ('LANGUAGES', 3),
+    'additional languages spoken 3': ('LANGUAGES', 3),
+}
+
+# NPI Extracts GENDER codes and the Provider values they map to (others are used as-is)
+GENDER_LABELS = {'F': 'Female', 'M': 'Male'}
+
+# Number of values at which all of a row's fallback columns are highlighted yellow
+FALLBACK_HIGHLIGHT_THRESHOLDS = {
+    'Specialty Derived': 6,   # 6+ specialties for 5 Specialty columns
+    'Suffix Derived': 4,      # 4+ suffixes for 3 Professional Suffix columns
+}
+
+# Sheet names accepted for the NPI Extracts data, in order of preference
+NPI_EXTRACTS_SHEET_NAMES = ('NPI Extracts', 'NPI_Extracts', 'NPI-Extracts')
+
+# Only these columns are parsed from NPI-Extracts.xlsx, all as strings
+NPI_EXTRACTS_COLUMNS = ('NPI Number',) + NPI_EXTRACTS_FIELDS
+
+# pandas only has a calamine engine from 2.2 on (requirements.txt pins pandas 2.1.4)
+CALAMINE_MIN_PANDAS_VERSION = (2, 2)
+
+
+def _calamine_engine_available():
     """
-    Fallback logic for Specialty 1 column:
-    - If 'Specialty 1' is empty for any row, get the NPI Number from that row
-    - Search for the NPI in NPI-Extracts.xlsx (NPI Extracts sheet, 'NPI Number' column)
-    - Get the 'Specialty Derived' value from the matched row
-    - Split by ';' (semicolon) and populate 'Specialty 1' through 'Specialty 5'
-    - If 6 or more values are found, highlight the Specialty columns for that row
+    Check whether pandas can read Excel files with the calamine engine.
     
     Returns:
-        bool: True if successful, False otherwise
+        bool: True if python-calamine is installed and pandas is 2.2 or newer
+    """
+    if importlib.util.find_spec('python_calamine') is None:
+        return False
+    pandas_version = tuple(int(part) for part in pd.__version__.split('.')[:2])
+    return pandas_version >= CALAMINE_MIN_PANDAS_VERSION
+
+
+# Use the Rust-based calamine reader when pandas supports it and python-calamine is installed
+NPI_EXTRACTS_ENGINE = 'calamine' if _calamine_engine_available() else 'openpyxl'
+
+
+@functools.lru_cache(maxsize=1)
+def _load_npi_extracts(npi_extracts_file, mtime_ns, size):
+    """
+    Read the NPI Extracts sheet of NPI-Extracts.xlsx.
+    
+    The first of NPI_EXTRACTS_SHEET_NAMES present in the file is used. Only
+    NPI_EXTRACTS_COLUMNS are parsed (the extract has dozens of unused
+    columns) and they are read as strings. Cached on (file, mtime_ns, size)
+    so all fallbacks share a single parse and an updated NPI-Extracts.xlsx
+    is re-read on the next call. The size catches a rewrite that lands in
+    the same modification-time tick on file systems with coarse mtimes.
+    """
+    with pd.ExcelFile(npi_extracts_file, engine=NPI_EXTRACTS_ENGINE) as npi_extracts_xlsx:
+        sheet_name = next(
+            (name for name in NPI_EXTRACTS_SHEET_NAMES if name in npi_extracts_xlsx.sheet_names),
+            NPI_EXTRACTS_SHEET_NAMES[0]
+        )
+        return npi_extracts_xlsx.parse(
+            sheet_name,
+            usecols=lambda column: column in NPI_EXTRACTS_COLUMNS,
+            dtype={column: 'string' for column in NPI_EXTRACTS_COLUMNS},
+        )
+
+
+def _normalize_npi(npi_value):
+    """
+    Normalize an NPI cell value for lookup (handle float/int/string formats).
+    
+    Args:
+        npi_value: The NPI value to normalize
+        
+    Returns:
+        str: Normalized NPI string, or None if the value is empty
+    """
+    if npi_value is None:
+        return None
+    if isinstance(npi_value, int):
+        return str(npi_value)
+    if isinstance(npi_value, float):
+        if npi_value.is_integer():
+            return str(int(npi_value))
+        return str(npi_value)
+    return _normalize_npi_text(str(npi_value))
+
+
+@functools.lru_cache(maxsize=65536)
+def _normalize_npi_text(npi_text):
+    """
+    String path of _normalize_npi, cached since the same NPI text repeats
+    across Provider rows (one row per provider location).
+    """
+    npi_key = npi_text.strip()
+    # Remove .0 suffix if present
+    if npi_key.endswith('.0'):
+        npi_key = npi_key[:-2]
+    return npi_key
+
+
+def _normalize_npi_series(npi_series):
+    """
+    Vectorized NPI normalization for a whole 'NPI Number' column.
+    
+    Mirrors the per-value rules used for Provider cells: integral floats lose
+    their decimal part, other values are stripped and a trailing '.0' removed.
+    Rows without an NPI are dropped; the original index is kept.
+    """
+    npi_series = npi_series[npi_series.notna()]
+    
+    if pd.api.types.is_float_dtype(npi_series):
+        npi_keys = npi_series.astype(str)
+        is_integer = npi_series.mod(1).eq(0)
+        npi_keys[is_integer] = npi_series[is_integer].astype('int64').astype(str)
+        return npi_keys
+    
+    return npi_series.astype(str).str.strip().str.removesuffix('.0')
+
+
+def _build_npi_lookup(npi_extracts_df):
+    """
+    Build a single NPI Number -> {field: value} lookup covering every column in
+    NPI_EXTRACTS_FIELDS, shared by all fallbacks.
+    
+    Only non-empty values are stored (blanks from the database are ignored);
+    a field that is empty for an NPI is left as None. GENDER codes are
+    stored already converted to their Provider value. Fields in
+    NPI_EXTRACTS_SPLIT_FIELDS are stored already split on ';' as a tuple of
+    interned strings, since the same specialty/suffix names repeat across
+    most providers.
+    """
+    # Normalize all NPI values at once and drop rows without a usable NPI
+    npi_keys = _normalize_npi_series(npi_extracts_df['NPI Number'])
+    npi_keys = npi_keys[npi_keys.ne('')]
+    
+    npi_lookup = {}
+    for field in NPI_EXTRACTS_FIELDS:
+        if field not in npi_extracts_df.columns:
+            continue
+        
+        # Only keep non-empty values for this field
+        values = npi_extracts_df.loc[npi_keys.index, field]
+        mask = values.notna() & values.astype(str).str.strip().ne('')
+        
+        for npi_key, value in zip(npi_keys[mask].tolist(), values[mask].tolist()):
+            if field in NPI_EXTRACTS_SPLIT_FIELDS:
+                # Split by semicolon and remove empty strings
+                value = tuple(sys.intern(part.strip()) for part in str(value).split(';') if part.strip())
+            elif field == 'GENDER':
+                # Convert 'F' to 'Female' and 'M' to 'Male', otherwise use as-is
+                value = str(value).strip()
+                value = GENDER_LABELS.get(value.upper(), value)
+            npi_record = npi_lookup.get(npi_key)
+            if npi_record is None:
+                npi_record = npi_lookup[npi_key] = dict.fromkeys(NPI_EXTRACTS_FIELDS)
+            npi_record[field] = value
+    
+    return npi_lookup
+
+
+def _find_provider_columns(provider_sheet):
+    """
+    Locate the NPI Number column and the columns populated by each fallback
+    in the Provider header row.
+    
+    Args:
+        provider_sheet: The Provider worksheet
+        
+    Returns:
+        tuple: (npi_col_idx, {field: {position: col_idx}}) with 1-based column indices
+    """
+    npi_col_idx = None
+    fallback_columns = {field: {} for field in NPI_EXTRACTS_FIELDS}
+    
+    # Search for the headers in the first row (values only, no Cell objects)
+    header_values = next(provider_sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    for col_idx, header_value in enumerate(header_values, start=1):
+        if header_value:
+            cell_value = str(header_value).strip().lower()
+            if cell_value == 'npi number':
+                npi_col_idx = col_idx
+            else:
+                header_info = PROVIDER_FALLBACK_HEADERS.get(cell_value)
+                if header_info is not None:
+                    field, position = header_info
+                    fallback_columns[field][position] = col_idx
+    
+    return npi_col_idx, fallback_columns
+
+
+def _fallback_values(field, value):
     """
+    Convert a stored NPI Extracts value into the values for the field's
+    Provider columns (in column order).
+    
+    Args:
+        field: NPI Extracts field name
+        value: Non-empty value from the NPI lookup
+        
+    Returns:
+        tuple/list: Values for the field's columns
+    """
+    if field == 'GENDER':
+        # Already converted to 'Female'/'Male' when the lookup was built
+        return (value,)
+    
+    if field == 'LANGUAGES':
+        # Split by comma, drop empty parts and 'ENGLISH'/'English' (case-insensitive),
+        # convert to Camel case (first letter uppercase, rest lowercase) - in one pass
+        lang_parts = [
+            lang.capitalize()
+            for part in str(value).split(',')
+            if (lang := part.strip()) and lang.upper() != 'ENGLISH'
+        ]
+        
+        # Take only first 3 languages (max 3)
+        return lang_parts[:3]
+    
+    # Specialty/Suffix Derived are already split by semicolon
+    return value
+
+
+def _apply_npi_fallbacks(fields, npi_extracts_df=None, wb=None):
+    """
+    Apply the NPI-Extracts fallbacks for the given fields in a single pass
+    over the Provider sheet of Template copy.xlsx.
+    
+    For every Provider row whose NPI is found in NPI-Extracts.xlsx and whose
+    first column for a field is empty, the field's columns are populated from
+    the NPI Extracts value and highlighted blue (yellow when there are more
+    values than the threshold allows). Headers of updated columns turn green.
+    
+    Args:
+        fields: NPI Extracts fields to apply (see NPI_EXTRACTS_FIELDS)
+        npi_extracts_df: Already-loaded 'NPI Extracts' DataFrame to reuse;
+            read from NPI-Extracts.xlsx when not provided
+        wb: Already-loaded Template copy.xlsx workbook to update in place; the
+            caller is then responsible for saving it. Loaded (and saved) here
+            when not provided
+    
+    Returns:
+        dict: field -> True if that fallback was applied successfully, False otherwise
+    """
+    results = dict.fromkeys(fields, False)
+    
     # File paths
     npi_extracts_file = EXCEL_FILES_DIR / 'NPI-Extracts.xlsx'
     template_file = EXCEL_FILES_DIR / 'Template copy.xlsx'
     
-    # Check if NPI-Extracts file exists
-    if not npi_extracts_file.exists():
-        return False
+    # Check if NPI-Extracts file exists (only needed when it has to be read)
+    if npi_extracts_df is None and not npi_extracts_file.exists():
+        return results
     
-    # Check if template file exists
-    if not template_file.exists():
-        return False
+    # Check if template file exists (only needed when it has to be loaded)
+    if wb is None and not template_file.exists():
+        return results
     
     try:
-        # Load the template workbook
-        wb = load_workbook(template_file)
+        # Load the template workbook unless the caller shares one (and saves it)
+        # (no VBA, external links or rich text - only values and fills are touched)
+        save_workbook = wb is None
+        if wb is None:
+            wb = load_workbook(template_file, keep_vba=False, keep_links=False, rich_text=False, data_only=False)
         
         # Check if 'Provider' sheet exists
         if 'Provider' not in wb.sheetnames:
-            return False
+            return results
         
         # Get the Provider sheet
         provider_sheet = wb['Provider']
         
-        # Find column headers
+        # Find column headers (as column indices)
         header_row = 1
-        npi_column_letter = None
-        specialty_columns = {}
+        npi_col_idx, fallback_columns = _find_provider_columns(provider_sheet)
         
-        # Search for the headers in the first row
-        for col_idx, cell in enumerate(provider_sheet[header_row], start=1):
-            if cell.value:
-                cell_value = str(cell.value).strip().lower()
-                if cell_value == 'npi number':
-                    npi_column_letter = get_column_letter(col_idx)
-                elif cell_value == 'specialty 1':
-                    specialty_columns[1] = get_column_letter(col_idx)
-                elif cell_value == 'specialty 2':
-                    specialty_columns[2] = get_column_letter(col_idx)
-                elif cell_value == 'specialty 3':
-                    specialty_columns[3] = get_column_letter(col_idx)
-                elif cell_value == 'specialty 4':
-                    specialty_columns[4] = get_column_letter(col_idx)
-                elif cell_value == 'specialty 5':
-                    specialty_columns[5] = get_column_letter(col_idx)
+        if npi_col_idx is None:
+            return results
         
-        if npi_column_letter is None or 1 not in specialty_columns:
-            return False
+        # A fallback can only run if its first column exists
+        fields = [field for field in fields if 1 in fallback_columns[field]]
         
-        # Read NPI-Extracts.xlsx
-        try:
-            npi_extracts_df = pd.read_excel(npi_extracts_file, sheet_name='NPI Extracts')
-        except Exception as e:
-            # Try alternative sheet name without space
+        # Read NPI-Extracts.xlsx unless the caller already did
+        if npi_extracts_df is None:
             try:
-                npi_extracts_df = pd.read_excel(npi_extracts_file, sheet_name='NPI Extracts')
-            except:
-                return False
+                file_stat = npi_extracts_file.stat()
+                npi_extracts_df = _load_npi_extracts(npi_extracts_file, file_stat.st_mtime_ns, file_stat.st_size)
+            except Exception:
+                return results
         
         # Check if required columns exist
-        if 'NPI Number' not in npi_extracts_df.columns or 'Specialty Derived' not in npi_extracts_df.columns:
-            return False
+        if 'NPI Number' not in npi_extracts_df.columns:
+            return results
+        fields = [field for field in fields if field in npi_extracts_df.columns]
         
-        # Create a lookup dictionary: NPI Number -> Specialty Derived
-        npi_lookup = {}
-        for idx, row in npi_extracts_df.iterrows():
-            npi_value = row['NPI Number']
-            specialty_derived = row['Specialty Derived']
-            
-            # Normalize NPI value (handle float/int/string formats)
-            if pd.notna(npi_value):
-                if isinstance(npi_value, float):
-                    if npi_value.is_integer():
-                        npi_key = str(int(npi_value))
-                    else:
-                        npi_key = str(npi_value)
-                else:
-                    npi_key = str(npi_value).strip()
-                    # Remove .0 suffix if present
-                    if npi_key.endswith('.0'):
-                        npi_key = npi_key[:-2]
-                
-                # Only store non-empty specialty values (ignore blanks from database)
-                if npi_key and pd.notna(specialty_derived) and str(specialty_derived).strip():
-                    npi_lookup[npi_key] = specialty_derived
+        # NPI Number -> NPI Extracts values lookup
+        npi_lookup = _build_npi_lookup(npi_extracts_df)
         
-        # Highlight colors
-        highlight_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")  # Yellow for 6+ specialties
-        fallback_fill = PatternFill(start_color="C1EAFF", end_color="C1EAFF", fill_type="solid")  # Blue for fallback cells
+        # Columns of each fallback in position order
+        field_columns = {field: sorted(fallback_columns[field].items()) for field in fields}
         
-        # Process each row in the Provider sheet
+        # Scan the Provider sheet values only (no Cell objects), collecting
+        # value updates and cell fills separately
         max_row = provider_sheet.max_row
-        rows_updated = 0
-        
-        for row_idx in range(2, max_row + 1):  # Start from row 2 (skip header)
-            # Check if Specialty 1 is empty
-            specialty_1_cell = provider_sheet[f"{specialty_columns[1]}{row_idx}"]
-            specialty_1_value = specialty_1_cell.value
-            
-            # Check if Specialty 1 is empty or None
-            is_empty = False
-            if specialty_1_value is None:
-                is_empty = True
-            elif isinstance(specialty_1_value, str) and not specialty_1_value.strip():
-                is_empty = True
+        rows_updated = dict.fromkeys(fields, 0)
+        updates = []
+        fills = []
+        
+        # Normalize every Provider NPI once, then do a single lookup per row
+        npi_keys = [
+            _normalize_npi(npi_value)
+            for (npi_value,) in provider_sheet.iter_rows(min_row=2, max_row=max_row, min_col=npi_col_idx, max_col=npi_col_idx, values_only=True)
+        ]
+        
+        # Rows after the last NPI can never match, so stop there instead of at
+        # max_row (which also counts formatted-but-empty rows at the bottom)
+        while npi_keys and not npi_keys[-1]:
+            npi_keys.pop()
+        max_row = len(npi_keys) + 1
+        
+        # Pre-scan the first column of each fallback so only empty rows are looked up
+        empty_rows = {
+            field: [
+                row_idx
+                for row_idx, (value,) in enumerate(
+                    provider_sheet.iter_rows(min_row=2, max_row=max_row, min_col=fallback_columns[field][1], max_col=fallback_columns[field][1], values_only=True),
+                    start=2
+                )
+                if value is None or (isinstance(value, str) and not value.strip())
+            ]
+            for field in fields
+        }
+        
+        for field in fields:
+            threshold = FALLBACK_HIGHLIGHT_THRESHOLDS.get(field)
             
-            if is_empty:
-                # Get NPI Number from this row
-                npi_cell = provider_sheet[f"{npi_column_letter}{row_idx}"]
-                npi_value = npi_cell.value
+            for row_idx in empty_rows[field]:
+                npi_record = npi_lookup.get(npi_keys[row_idx - 2])
+                if npi_record is None:
+                    continue
+                
+                npi_value = npi_record[field]
+                if npi_value is None:
+                    continue
+                
+                values = _fallback_values(field, npi_value)
+                num_values = len(values)
+                should_highlight = threshold is not None and num_values >= threshold
                 
-                if npi_value is not None:
-                    # Normalize NPI value for lookup
-                    if isinstance(npi_value, float):
-                        if npi_value.is_integer():
-                            npi_key = str(int(npi_value))
-                        else:
-                            npi_key = str(npi_value)
+                for position, col_idx in field_columns[field]:
+                    if position <= num_values:
+                        # Highlight fallback cells in blue
+                        new_value = values[position - 1]
+                        fill = _FALLBACK_FILL
                     else:
-                        npi_key = str(npi_value).strip()
-                        # Remove .0 suffix if present
-                        if npi_key.endswith('.0'):
-                            npi_key = npi_key[:-2]
+                        new_value = None
+                        fill = None
                     
-                    # Look up Specialty Derived value
-                    if npi_key in npi_lookup:
-                        specialty_derived_value = npi_lookup[npi_key]
-                        
-                        if pd.notna(specialty_derived_value) and str(specialty_derived_value).strip():
-                            # Split by semicolon
-                            specialty_parts = [part.strip() for part in str(specialty_derived_value).split(';')]
-                            # Remove empty strings
-                            specialty_parts = [part for part in specialty_parts if part]
-                            
-                            # Populate Specialty 1 through Specialty 5
-                            num_specialties = len(specialty_parts)
-                            should_highlight = num_specialties >= 6
-                            
-                            for i in range(1, 6):
-                                if i in specialty_columns:
-                                    cell = provider_sheet[f"{specialty_columns[i]}{row_idx}"]
-                                    if i <= num_specialties:
-                                        cell.value = specialty_parts[i - 1]
-                                        # Highlight fallback cells in blue
-                                        cell.fill = fallback_fill
-                                    else:
-                                        cell.value = None
-                                    
-                                    # Highlight if 6+ specialties found (yellow overrides blue)
-                                    if should_highlight:
-                                        cell.fill = highlight_fill
-                            
-                            rows_updated += 1
+                    # Highlight if too many values found (yellow overrides blue)
+                    if should_highlight:
+                        fill = _HIGHLIGHT_FILL
+                    
+                    updates.append((row_idx, col_idx, new_value))
+                    if fill is not None:
+                        fills.append((row_idx, col_idx, fill))
+                
+                rows_updated[field] += 1
+        
+        # Write all values first, then apply the fills in their own pass so the
+        # shared fill objects are registered in the style table back to back
+        for row_idx, col_idx, new_value in updates:
+            provider_sheet.cell(row=row_idx, column=col_idx).value = new_value
+        
+        for row_idx, col_idx, fill in fills:
+            provider_sheet.cell(row=row_idx, column=col_idx).fill = fill
         
-        # If any rows were updated, highlight the Specialty column headers green
-        if rows_updated > 0:
-            green_fill = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")
-            for i in range(1, 6):
-                if i in specialty_columns:
-                    header_cell = provider_sheet[f"{specialty_columns[i]}{header_row}"]
-                    header_cell.fill = green_fill
+        # If any rows were updated, highlight that fallback's column headers green
+        for field in fields:
+            if rows_updated[field] > 0:
+                for position, col_idx in field_columns[field]:
+                    provider_sheet.cell(row=header_row, column=col_idx).fill = _GREEN_HEADER_FILL
         
-        # Save the workbook
-        wb.save(template_file)
-        return True
+        # Save the workbook (nothing to write back if no fallback fired)
+        if save_workbook and updates:
+            wb.save(template_file)
+        
+        for field in fields:
+            results[field] = True
+        return results
         
     except Exception as e:
-        return False
+        return dict.fromkeys(results, False)
 
 
-def apply_professional_suffix_fallback_from_npi_extracts():
+def apply_specialty_fallback_from_npi_extracts(npi_extracts_df=None, wb=None):
+    """
+    Fallback logic for Specialty 1 column:
+    - If 'Specialty 1' is empty for any row, get the NPI Number from that row
+    - Search for the NPI in NPI-Extracts.xlsx (NPI Extracts sheet, 'NPI Number' column)
+    - Get the 'Specialty Derived' value from the matched row
+    - Split by ';' (semicolon) and populate 'Specialty 1' through 'Specialty 5'
+    - If 6 or more values are found, highlight the Specialty columns for that row
+    
+    Args:
+        npi_extracts_df: Already-loaded 'NPI Extracts' DataFrame to reuse;
+            read from NPI-Extracts.xlsx when not provided
+        wb: Already-loaded Template copy.xlsx workbook to update in place
+            without saving; loaded and saved here when not provided
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    return _apply_npi_fallbacks(['Specialty Derived'], npi_extracts_df, wb)['Specialty Derived']
+
+
+def apply_professional_suffix_fallback_from_npi_extracts(npi_extracts_df=None, wb=None):
     """
     Fallback logic for Professional Suffix 1 column:
     - If 'Professional Suffix 1' is empty for any row, get the NPI Number from that row
@@ -209,175 +475,19 @@ def apply_professional_suffix_fallback_from_npi_extracts():
     - Split by ';' (semicolon) and populate 'Professional Suffix 1' through 'Professional Suffix 3'
     - If 4 or more values are found, highlight the Professional Suffix columns for that row
     
+    Args:
+        npi_extracts_df: Already-loaded 'NPI Extracts' DataFrame to reuse;
+            read from NPI-Extracts.xlsx when not provided
+        wb: Already-loaded Template copy.xlsx workbook to update in place
+            without saving; loaded and saved here when not provided
+    
     Returns:
         bool: True if successful, False otherwise
     """
-    # File paths
-    npi_extracts_file = EXCEL_FILES_DIR / 'NPI-Extracts.xlsx'
-    template_file = EXCEL_FILES_DIR / 'Template copy.xlsx'
-    
-    # Check if NPI-Extracts file exists
-    if not npi_extracts_file.exists():
-        return False
-    
-    # Check if template file exists
-    if not template_file.exists():
-        return False
-    
-    try:
-        # Load the template workbook
-        wb = load_workbook(template_file)
-        
-        # Check if 'Provider' sheet exists
-        if 'Provider' not in wb.sheetnames:
-            return False
-        
-        # Get the Provider sheet
-        provider_sheet = wb['Provider']
-        
-        # Find column headers
-        header_row = 1
-        npi_column_letter = None
-        suffix_columns = {}
-        
-        # Search for the headers in the first row
-        for col_idx, cell in enumerate(provider_sheet[header_row], start=1):
-            if cell.value:
-                cell_value = str(cell.value).strip().lower()
-                if cell_value == 'npi number':
-                    npi_column_letter = get_column_letter(col_idx)
-                elif cell_value == 'professional suffix 1':
-                    suffix_columns[1] = get_column_letter(col_idx)
-                elif cell_value == 'professional suffix 2':
-                    suffix_columns[2] = get_column_letter(col_idx)
-                elif cell_value == 'professional suffix 3':
-                    suffix_columns[3] = get_column_letter(col_idx)
-        
-        if npi_column_letter is None or 1 not in suffix_columns:
-            return False
-        
-        # Read NPI-Extracts.xlsx
-        try:
-            npi_extracts_df = pd.read_excel(npi_extracts_file, sheet_name='NPI Extracts')
-        except Exception as e:
-            # Try alternative sheet name without space
-            try:
-                npi_extracts_df = pd.read_excel(npi_extracts_file, sheet_name='NPI Extracts')
-            except:
-                return False
-        
-        # Check if required columns exist
-        if 'NPI Number' not in npi_extracts_df.columns or 'Suffix Derived' not in npi_extracts_df.columns:
-            return False
-        
-        # Create a lookup dictionary: NPI Number -> Suffix Derived
-        npi_lookup = {}
-        for idx, row in npi_extracts_df.iterrows():
-            npi_value = row['NPI Number']
-            suffix_derived = row['Suffix Derived']
-            
-            # Normalize NPI value (handle float/int/string formats)
-            if pd.notna(npi_value):
-                if isinstance(npi_value, float):
-                    if npi_value.is_integer():
-                        npi_key = str(int(npi_value))
-                    else:
-                        npi_key = str(npi_value)
-                else:
-                    npi_key = str(npi_value).strip()
-                    # Remove .0 suffix if present
-                    if npi_key.endswith('.0'):
-                        npi_key = npi_key[:-2]
-                
-                # Only store non-empty suffix values (ignore blanks from database)
-                if npi_key and pd.notna(suffix_derived) and str(suffix_derived).strip():
-                    npi_lookup[npi_key] = suffix_derived
-        
-        # Highlight colors
-        highlight_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")  # Yellow for 4+ suffixes
-        fallback_fill = PatternFill(start_color="C1EAFF", end_color="C1EAFF", fill_type="solid")  # Blue for fallback cells
-        
-        # Process each row in the Provider sheet
-        max_row = provider_sheet.max_row
-        rows_updated = 0
-        
-        for row_idx in range(2, max_row + 1):  # Start from row 2 (skip header)
-            # Check if Professional Suffix 1 is empty
-            suffix_1_cell = provider_sheet[f"{suffix_columns[1]}{row_idx}"]
-            suffix_1_value = suffix_1_cell.value
-            
-            # Check if Professional Suffix 1 is empty or None
-            is_empty = False
-            if suffix_1_value is None:
-                is_empty = True
-            elif isinstance(suffix_1_value, str) and not suffix_1_value.strip():
-                is_empty = True
-            
-            if is_empty:
-                # Get NPI Number from this row
-                npi_cell = provider_sheet[f"{npi_column_letter}{row_idx}"]
-                npi_value = npi_cell.value
-                
-                if npi_value is not None:
-                    # Normalize NPI value for lookup
-                    if isinstance(npi_value, float):
-                        if npi_value.is_integer():
-                            npi_key = str(int(npi_value))
-                        else:
-                            npi_key = str(npi_value)
-                    else:
-                        npi_key = str(npi_value).strip()
-                        # Remove .0 suffix if present
-                        if npi_key.endswith('.0'):
-                            npi_key = npi_key[:-2]
-                    
-                    # Look up Suffix Derived value
-                    if npi_key in npi_lookup:
-                        suffix_derived_value = npi_lookup[npi_key]
-                        
-                        if pd.notna(suffix_derived_value) and str(suffix_derived_value).strip():
-                            # Split by semicolon
-                            suffix_parts = [part.strip() for part in str(suffix_derived_value).split(';')]
-                            # Remove empty strings
-                            suffix_parts = [part for part in suffix_parts if part]
-                            
-                            # Populate Professional Suffix 1 through Professional Suffix 3
-                            num_suffixes = len(suffix_parts)
-                            should_highlight = num_suffixes >= 4
-                            
-                            for i in range(1, 4):
-                                if i in suffix_columns:
-                                    cell = provider_sheet[f"{suffix_columns[i]}{row_idx}"]
-                                    if i <= num_suffixes:
-                                        cell.value = suffix_parts[i - 1]
-                                        # Highlight fallback cells in blue
-                                        cell.fill = fallback_fill
-                                    else:
-                                        cell.value = None
-                                    
-                                    # Highlight if 4+ suffixes found (yellow overrides blue)
-                                    if should_highlight:
-                                        cell.fill = highlight_fill
-                            
-                            rows_updated += 1
-        
-        # If any rows were updated, highlight the Professional Suffix column headers green
-        if rows_updated > 0:
-            green_fill = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")
-            for i in range(1, 4):
-                if i in suffix_columns:
-                    header_cell = provider_sheet[f"{suffix_columns[i]}{header_row}"]
-                    header_cell.fill = green_fill
-        
-        # Save the workbook
-        wb.save(template_file)
-        return True
-        
-    except Exception as e:
-        return False
+    return _apply_npi_fallbacks(['Suffix Derived'], npi_extracts_df, wb)['Suffix Derived']
 
 
-def apply_gender_fallback_from_npi_extracts():
+def apply_gender_fallback_from_npi_extracts(npi_extracts_df=None, wb=None):
     """
     Fallback logic for Gender column:
     - If 'Gender' is empty for any row, get the NPI Number from that row
@@ -386,158 +496,19 @@ def apply_gender_fallback_from_npi_extracts():
     - Convert 'F' to 'Female' and 'M' to 'Male'
     - Put it in the Gender column of the Provider tab
     
+    Args:
+        npi_extracts_df: Already-loaded 'NPI Extracts' DataFrame to reuse;
+            read from NPI-Extracts.xlsx when not provided
+        wb: Already-loaded Template copy.xlsx workbook to update in place
+            without saving; loaded and saved here when not provided
+    
     Returns:
         bool: True if successful, False otherwise
     """
-    # File paths
-    npi_extracts_file = EXCEL_FILES_DIR / 'NPI-Extracts.xlsx'
-    template_file = EXCEL_FILES_DIR / 'Template copy.xlsx'
-    
-    # Check if NPI-Extracts file exists
-    if not npi_extracts_file.exists():
-        return False
-    
-    # Check if template file exists
-    if not template_file.exists():
-        return False
-    
-    try:
-        # Load the template workbook
-        wb = load_workbook(template_file)
-        
-        # Check if 'Provider' sheet exists
-        if 'Provider' not in wb.sheetnames:
-            return False
-        
-        # Get the Provider sheet
-        provider_sheet = wb['Provider']
-        
-        # Find column headers
-        header_row = 1
-        npi_column_letter = None
-        gender_column_letter = None
-        
-        # Search for the headers in the first row
-        for col_idx, cell in enumerate(provider_sheet[header_row], start=1):
-            if cell.value:
-                cell_value = str(cell.value).strip().lower()
-                if cell_value == 'npi number':
-                    npi_column_letter = get_column_letter(col_idx)
-                elif cell_value == 'gender':
-                    gender_column_letter = get_column_letter(col_idx)
-        
-        if npi_column_letter is None or gender_column_letter is None:
-            return False
-        
-        # Read NPI-Extracts.xlsx
-        try:
-            npi_extracts_df = pd.read_excel(npi_extracts_file, sheet_name='NPI Extracts')
-        except Exception as e:
-            # Try alternative sheet name without space
-            try:
-                npi_extracts_df = pd.read_excel(npi_extracts_file, sheet_name='NPI Extracts')
-            except:
-                return False
-        
-        # Check if required columns exist
-        if 'NPI Number' not in npi_extracts_df.columns or 'GENDER' not in npi_extracts_df.columns:
-            return False
-        
-        # Create a lookup dictionary: NPI Number -> GENDER
-        npi_lookup = {}
-        for idx, row in npi_extracts_df.iterrows():
-            npi_value = row['NPI Number']
-            gender_value = row['GENDER']
-            
-            # Normalize NPI value (handle float/int/string formats)
-            if pd.notna(npi_value):
-                if isinstance(npi_value, float):
-                    if npi_value.is_integer():
-                        npi_key = str(int(npi_value))
-                    else:
-                        npi_key = str(npi_value)
-                else:
-                    npi_key = str(npi_value).strip()
-                    # Remove .0 suffix if present
-                    if npi_key.endswith('.0'):
-                        npi_key = npi_key[:-2]
-                
-                # Only store non-empty gender values (ignore blanks from database)
-                if npi_key and pd.notna(gender_value) and str(gender_value).strip():
-                    npi_lookup[npi_key] = gender_value
-        
-        # Process each row in the Provider sheet
-        max_row = provider_sheet.max_row
-        rows_updated = 0
-        
-        for row_idx in range(2, max_row + 1):  # Start from row 2 (skip header)
-            # Check if Gender is empty
-            gender_cell = provider_sheet[f"{gender_column_letter}{row_idx}"]
-            gender_value = gender_cell.value
-            
-            # Check if Gender is empty or None
-            is_empty = False
-            if gender_value is None:
-                is_empty = True
-            elif isinstance(gender_value, str) and not gender_value.strip():
-                is_empty = True
-            
-            if is_empty:
-                # Get NPI Number from this row
-                npi_cell = provider_sheet[f"{npi_column_letter}{row_idx}"]
-                npi_value = npi_cell.value
-                
-                if npi_value is not None:
-                    # Normalize NPI value for lookup
-                    if isinstance(npi_value, float):
-                        if npi_value.is_integer():
-                            npi_key = str(int(npi_value))
-                        else:
-                            npi_key = str(npi_value)
-                    else:
-                        npi_key = str(npi_value).strip()
-                        # Remove .0 suffix if present
-                        if npi_key.endswith('.0'):
-                            npi_key = npi_key[:-2]
-                    
-                    # Look up GENDER value
-                    if npi_key in npi_lookup:
-                        gender_code = npi_lookup[npi_key]
-                        
-                        if pd.notna(gender_code) and str(gender_code).strip():
-                            # Convert 'F' to 'Female' and 'M' to 'Male', otherwise use as-is
-                            gender_code_upper = str(gender_code).strip().upper()
-                            fallback_fill = PatternFill(start_color="C1EAFF", end_color="C1EAFF", fill_type="solid")  # Blue for fallback cells
-                            
-                            if gender_code_upper == 'F':
-                                gender_cell.value = 'Female'
-                                gender_cell.fill = fallback_fill
-                                rows_updated += 1
-                            elif gender_code_upper == 'M':
-                                gender_cell.value = 'Male'
-                                gender_cell.fill = fallback_fill
-                                rows_updated += 1
-                            else:
-                                # For any other value, use it as-is
-                                gender_cell.value = str(gender_code).strip()
-                                gender_cell.fill = fallback_fill
-                                rows_updated += 1
-        
-        # If any rows were updated, highlight the Gender column header green
-        if rows_updated > 0:
-            green_fill = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")
-            header_cell = provider_sheet[f"{gender_column_letter}{header_row}"]
-            header_cell.fill = green_fill
-        
-        # Save the workbook
-        wb.save(template_file)
-        return True
-        
-    except Exception as e:
-        return False
+    return _apply_npi_fallbacks(['GENDER'], npi_extracts_df, wb)['GENDER']
 
 
-def apply_additional_languages_fallback_from_npi_extracts():
+def apply_additional_languages_fallback_from_npi_extracts(npi_extracts_df=None, wb=None):
     """
     Fallback logic for Additional Languages Spoken 1 column:
     - If 'Additional Languages Spoken 1' is empty for any row, get the NPI Number from that row
@@ -547,211 +518,48 @@ def apply_additional_languages_fallback_from_npi_extracts():
     - Filter out 'ENGLISH' or 'English' (case-insensitive)
     - Populate 'Additional Languages Spoken 1' through 'Additional Languages Spoken 3' (max 3)
     
+    Args:
+        npi_extracts_df: Already-loaded 'NPI Extracts' DataFrame to reuse;
+            read from NPI-Extracts.xlsx when not provided
+        wb: Already-loaded Template copy.xlsx workbook to update in place
+            without saving; loaded and saved here when not provided
+    
     Returns:
         bool: True if successful, False otherwise
     """
-    # File paths
-    npi_extracts_file = EXCEL_FILES_DIR / 'NPI-Extracts.xlsx'
-    template_file = EXCEL_FILES_DIR / 'Template copy.xlsx'
-    
-    # Check if NPI-Extracts file exists
-    if not npi_extracts_file.exists():
-        return False
+    return _apply_npi_fallbacks(['LANGUAGES'], npi_extracts_df, wb)['LANGUAGES']
+
+
+def apply_npi_fallbacks(wb=None):
+    """
+    Apply the Specialty, Professional Suffix, Gender and Additional Languages
+    fallbacks in a single pass over the Provider sheet (one workbook load/save
+    and one NPI-Extracts read for all of them).
     
-    # Check if template file exists
-    if not template_file.exists():
-        return False
+    Args:
+        wb: Optional already-loaded Template copy.xlsx workbook; when given it
+            is updated in place and the caller is responsible for saving it
     
+    Returns:
+        list: (fallback name, success) for each fallback, in FALLBACK_NAMES order
+    """
     try:
-        # Load the template workbook
-        wb = load_workbook(template_file)
-        
-        # Check if 'Provider' sheet exists
-        if 'Provider' not in wb.sheetnames:
-            return False
-        
-        # Get the Provider sheet
-        provider_sheet = wb['Provider']
-        
-        # Find column headers
-        header_row = 1
-        npi_column_letter = None
-        lang_columns = {}
-        
-        # Search for the headers in the first row
-        for col_idx, cell in enumerate(provider_sheet[header_row], start=1):
-            if cell.value:
-                cell_value = str(cell.value).strip().lower()
-                if cell_value == 'npi number':
-                    npi_column_letter = get_column_letter(col_idx)
-                elif cell_value == 'additional language spoken 1' or cell_value == 'additional languages spoken 1':
-                    lang_columns[1] = get_column_letter(col_idx)
-                elif cell_value == 'additional language spoken 2' or cell_value == 'additional languages spoken 2':
-                    lang_columns[2] = get_column_letter(col_idx)
-                elif cell_value == 'additional language spoken 3' or cell_value == 'additional languages spoken 3':
-                    lang_columns[3] = get_column_letter(col_idx)
-        
-        if npi_column_letter is None or 1 not in lang_columns:
-            return False
-        
-        # Read NPI-Extracts.xlsx
-        try:
-            npi_extracts_df = pd.read_excel(npi_extracts_file, sheet_name='NPI Extracts')
-        except Exception as e:
-            # Try alternative sheet name without space
-            try:
-                npi_extracts_df = pd.read_excel(npi_extracts_file, sheet_name='NPI Extracts')
-            except:
-                return False
-        
-        # Check if required columns exist
-        if 'NPI Number' not in npi_extracts_df.columns or 'LANGUAGES' not in npi_extracts_df.columns:
-            return False
-        
-        # Create a lookup dictionary: NPI Number -> LANGUAGES
-        npi_lookup = {}
-        for idx, row in npi_extracts_df.iterrows():
-            npi_value = row['NPI Number']
-            languages_value = row['LANGUAGES']
-            
-            # Normalize NPI value (handle float/int/string formats)
-            if pd.notna(npi_value):
-                if isinstance(npi_value, float):
-                    if npi_value.is_integer():
-                        npi_key = str(int(npi_value))
-                    else:
-                        npi_key = str(npi_value)
-                else:
-                    npi_key = str(npi_value).strip()
-                    # Remove .0 suffix if present
-                    if npi_key.endswith('.0'):
-                        npi_key = npi_key[:-2]
-                
-                # Only store non-empty language values (ignore blanks from database)
-                if npi_key and pd.notna(languages_value) and str(languages_value).strip():
-                    npi_lookup[npi_key] = languages_value
-        
-        # Highlight color for fallback cells
-        fallback_fill = PatternFill(start_color="C1EAFF", end_color="C1EAFF", fill_type="solid")  # Blue
-        
-        # Process each row in the Provider sheet
-        max_row = provider_sheet.max_row
-        rows_updated = 0
-        
-        for row_idx in range(2, max_row + 1):  # Start from row 2 (skip header)
-            # Check if Additional Languages Spoken 1 is empty
-            lang_1_cell = provider_sheet[f"{lang_columns[1]}{row_idx}"]
-            lang_1_value = lang_1_cell.value
-            
-            # Check if Additional Languages Spoken 1 is empty or None
-            is_empty = False
-            if lang_1_value is None:
-                is_empty = True
-            elif isinstance(lang_1_value, str) and not lang_1_value.strip():
-                is_empty = True
-            
-            if is_empty:
-                # Get NPI Number from this row
-                npi_cell = provider_sheet[f"{npi_column_letter}{row_idx}"]
-                npi_value = npi_cell.value
-                
-                if npi_value is not None:
-                    # Normalize NPI value for lookup
-                    if isinstance(npi_value, float):
-                        if npi_value.is_integer():
-                            npi_key = str(int(npi_value))
-                        else:
-                            npi_key = str(npi_value)
-                    else:
-                        npi_key = str(npi_value).strip()
-                        # Remove .0 suffix if present
-                        if npi_key.endswith('.0'):
-                            npi_key = npi_key[:-2]
-                    
-                    # Look up LANGUAGES value
-                    if npi_key in npi_lookup:
-                        languages_value = npi_lookup[npi_key]
-                        
-                        if pd.notna(languages_value) and str(languages_value).strip():
-                            # Split by comma
-                            lang_parts = [part.strip() for part in str(languages_value).split(',')]
-                            # Remove empty strings
-                            lang_parts = [part for part in lang_parts if part]
-                            
-                            # Filter out 'ENGLISH' or 'English' (case-insensitive)
-                            lang_parts = [lang for lang in lang_parts if lang.strip().upper() != 'ENGLISH']
-                            
-                            # Convert to Camel case (first letter uppercase, rest lowercase)
-                            lang_parts = [lang.strip().capitalize() if lang.strip() else lang for lang in lang_parts]
-                            
-                            # Take only first 3 languages (max 3)
-                            lang_parts = lang_parts[:3]
-                            
-                            # Populate Additional Languages Spoken 1 through 3
-                            for i in range(1, 4):
-                                if i in lang_columns:
-                                    cell = provider_sheet[f"{lang_columns[i]}{row_idx}"]
-                                    if i <= len(lang_parts):
-                                        cell.value = lang_parts[i - 1]
-                                        # Highlight fallback cells in blue
-                                        cell.fill = fallback_fill
-                                    else:
-                                        cell.value = None
-                            
-                            rows_updated += 1
-        
-        # If any rows were updated, highlight the Additional Languages Spoken column headers green
-        if rows_updated > 0:
-            green_fill = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")
-            for i in range(1, 4):
-                if i in lang_columns:
-                    header_cell = provider_sheet[f"{lang_columns[i]}{header_row}"]
-                    header_cell.fill = green_fill
-        
-        # Save the workbook
-        wb.save(template_file)
-        return True
-        
+        field_results = _apply_npi_fallbacks(NPI_EXTRACTS_FIELDS, wb=wb)
     except Exception as e:
-        return False
+        field_results = dict.fromkeys(NPI_EXTRACTS_FIELDS, False)
+    
+    return [(FALLBACK_NAMES[field], field_results[field]) for field in NPI_EXTRACTS_FIELDS]
 
 
 def apply_all_fallbacks():
     """
-    Apply all fallback logics in sequence.
+    Apply all fallback logics.
     
     Returns:
         bool: True if all fallbacks were successful, False otherwise
     """
-    results = []
-    
-    # Apply Specialty fallback
-    try:
-        success = apply_specialty_fallback_from_npi_extracts()
-        results.append(("Specialty Fallback", success))
-    except Exception as e:
-        results.append(("Specialty Fallback", False))
-    
-    # Apply Professional Suffix fallback
-    try:
-        success = apply_professional_suffix_fallback_from_npi_extracts()
-        results.append(("Professional Suffix Fallback", success))
-    except Exception as e:
-        results.append(("Professional Suffix Fallback", False))
-    
-    # Apply Gender fallback
-    try:
-        success = apply_gender_fallback_from_npi_extracts()
-        results.append(("Gender Fallback", success))
-    except Exception as e:
-        results.append(("Gender Fallback", False))
-    
-    # Apply Additional Languages fallback
-    try:
-        success = apply_additional_languages_fallback_from_npi_extracts()
-        results.append(("Additional Languages Fallback", success))
-    except Exception as e:
-        results.append(("Additional Languages Fallback", False))
+    # Specialty, Professional Suffix, Gender and Additional Languages fallbacks together
+    results = apply_npi_fallbacks()
     
     # Add more fallback functions here as they are created
     
@@ -760,4 +568,3 @@ def apply_all_fallbacks():
 
 if __name__ == "__main__":
     apply_all_fallbacks()
-
@@ -18,7 +18,7 @@ from practicemngmt import extract_practice_cloud_id_to_template
 from Dropdown import apply_dropdowns_to_template
 from Formulas import apply_formulas_to_template
 from PatientsAccepted import apply_patients_accepted_to_template
-from fallbacks import apply_specialty_fallback_from_npi_extracts, apply_professional_suffix_fallback_from_npi_extracts, apply_gender_fallback_from_npi_extracts, apply_additional_languages_fallback_from_npi_extracts
+from fallbacks import apply_npi_fallbacks, FALLBACK_NAMES
 from similarprovider import merge_duplicate_providers
 from checkdiff import check_differences
 
@@ -85,47 +85,42 @@ for column_name, extraction_func in column_extraction_functions:
     except Exception as e:
         pass
 
-# Apply fallback logics
+# Fallbacks and the duplicate provider merge share one load of Template copy.xlsx
+# (if it can't be loaded here, each step loads and saves it on its own)
 try:
-    success = apply_specialty_fallback_from_npi_extracts()
-    if success:
-        print(f"✓ Successfully Applied Specialty Fallback")
-    else:
-        print(f"✗ Failed to apply Specialty Fallback")
+    shared_wb = load_workbook(destination_file)
 except Exception as e:
-    print(f"✗ Failed to apply Specialty Fallback")
+    shared_wb = None
 
+# Apply fallback logics
 try:
-    success = apply_professional_suffix_fallback_from_npi_extracts()
-    if success:
-        print(f"✓ Successfully Applied Professional Suffix Fallback")
-    else:
-        print(f"✗ Failed to apply Professional Suffix Fallback")
+    fallback_results = apply_npi_fallbacks(wb=shared_wb)
 except Exception as e:
-    print(f"✗ Failed to apply Professional Suffix Fallback")
+    # Drop the shared workbook so its partial fallback edits are never saved;
+    # the duplicate provider merge then loads and saves Template copy.xlsx itself
+    shared_wb = None
+    fallback_results = [(fallback_name, False) for fallback_name in FALLBACK_NAMES.values()]
 
-try:
-    success = apply_gender_fallback_from_npi_extracts()
+for fallback_name, success in fallback_results:
     if success:
-        print(f"✓ Successfully Applied Gender Fallback")
+        print(f"✓ Successfully Applied {fallback_name}")
     else:
-        print(f"✗ Failed to apply Gender Fallback")
-except Exception as e:
-    print(f"✗ Failed to apply Gender Fallback")
+        print(f"✗ Failed to apply {fallback_name}")
 
-try:
-    success = apply_additional_languages_fallback_from_npi_extracts()
-    if success:
-        print(f"✓ Successfully Applied Additional Languages Fallback")
-    else:
-        print(f"✗ Failed to apply Additional Languages Fallback")
-except Exception as e:
-    print(f"✗ Failed to apply Additional Languages Fallback")
+# Save the fallbacks before merging, so a failed merge leaves them in place
+if shared_wb is not None:
+    try:
+        shared_wb.save(destination_file)
+    except Exception as e:
+        print(f"✗ Failed to save fallbacks")
 
 # Merge duplicate providers based on NPI Number
 try:
-    success = merge_duplicate_providers()
+    success = merge_duplicate_providers(wb=shared_wb)
     if success:
+        # Only a successful merge is saved; a failed one may have deleted some rows already
+        if shared_wb is not None:
+            shared_wb.save(destination_file)
         print(f"✓ Successfully Merged Duplicate Providers")
     else:
         print(f"✗ Failed to merge duplicate providers")
@@ -10,7 +10,7 @@ from pathlib import Path
 import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill, Font, Border, Side
-from openpyxl.utils import get_column_letter
+from openpyxl.utils import column_index_from_string
 
 # Get the project root directory (parent of Transposition Logics folder)
 SCRIPT_DIR = Path(__file__).parent
@@ -18,6 +18,39 @@ PROJECT_ROOT = SCRIPT_DIR.parent
 BACKEND_DIR = PROJECT_ROOT / 'backend'
 EXCEL_FILES_DIR = BACKEND_DIR / 'Excel Files'
 
+def normalize_header(value):
+    """
+    Normalize a header cell value for comparison (stripped and lowercase).
+    Header values are almost always strings, so those skip the str() conversion.
+    
+    Args:
+        value: The header cell value
+        
+    Returns:
+        str: Normalized header, or empty string for an empty cell
+    """
+    if isinstance(value, str):
+        return value.strip().lower()
+    return str(value).strip().lower() if value else ''
+
+def get_header_columns(sheet, header_row):
+    """
+    Map each header in a sheet's header row to its column.
+    
+    Args:
+        sheet: The worksheet to scan
+        header_row: Row number of the header row
+        
+    Returns:
+        dict: Lowercase, stripped header -> 1-based column index (first column for a repeated header)
+    """
+    header_values = next(sheet.iter_rows(min_row=header_row, max_row=header_row, values_only=True), ())
+    header_columns = {}
+    for col_idx, value in enumerate(header_values, start=1):
+        if value:
+            header_columns.setdefault(normalize_header(value), col_idx)
+    return header_columns
+
 def extract_practice_cloud_id_to_template():
     """
     Extract Practice Cloud ID and Practice NAME values from Practice_Locations.xlsx and write to Template copy.xlsx
@@ -64,7 +97,27 @@ def extract_practice_cloud_id_to_template():
                 practice_name_column_name = col_name
                 break
         
-        # Load the template workbook
+        # Create a mapping of Practice Cloud ID to Practice Name
+        # Use a dictionary to handle duplicates (keep the first non-empty Practice Name for each Cloud ID)
+        practice_data = {}  # cloud_id -> practice_name
+        for _, row in practice_df.iterrows():
+            cloud_id = row.get('Practice Cloud ID', '')
+            if pd.notna(cloud_id) and cloud_id != '':
+                cloud_id_str = str(cloud_id).strip()
+                # Only add if not already in dictionary
+                if cloud_id_str not in practice_data:
+                    practice_name = ''
+                    if practice_name_column_name:
+                        practice_name = row.get(practice_name_column_name, '')
+                    if pd.notna(practice_name) and practice_name != '':
+                        practice_data[cloud_id_str] = str(practice_name).strip()
+                    else:
+                        practice_data[cloud_id_str] = ''
+        
+        if not practice_data:
+            return False
+        
+        # Load the template workbook only once there is practice data to write
         wb = load_workbook(template_file)
         
         # Check if 'ValidationAndReference' sheet exists
@@ -77,6 +130,8 @@ def extract_practice_cloud_id_to_template():
         # Column AD for Practice Cloud ID, Column AE for Practice Name
         practice_cloud_id_column = 'AD'
         practice_name_column = 'AE'
+        practice_cloud_id_col_idx = column_index_from_string(practice_cloud_id_column)
+        practice_name_col_idx = column_index_from_string(practice_name_column)
         header_row = 1
         
         # Define styles: bold font, purple fill color, and all borders
@@ -91,7 +146,7 @@ def extract_practice_cloud_id_to_template():
         )
         
         # Set headers if they don't exist
-        header_cell = validation_sheet[f"{practice_cloud_id_column}{header_row}"]
+        header_cell = validation_sheet.cell(row=header_row, column=practice_cloud_id_col_idx)
         if not header_cell.value or str(header_cell.value).strip() == '':
             header_cell.value = 'Practice Cloud ID'
         # Apply styles to header (always apply, even if header already exists)
@@ -99,7 +154,7 @@ def extract_practice_cloud_id_to_template():
         header_cell.fill = purple_fill
         header_cell.border = thin_border
         
-        header_cell = validation_sheet[f"{practice_name_column}{header_row}"]
+        header_cell = validation_sheet.cell(row=header_row, column=practice_name_col_idx)
         if not header_cell.value or str(header_cell.value).strip() == '':
             header_cell.value = 'Practice Name'
         # Apply styles to header (always apply, even if header already exists)
@@ -107,37 +162,32 @@ def extract_practice_cloud_id_to_template():
         header_cell.fill = purple_fill
         header_cell.border = thin_border
         
-        # Create a mapping of Practice Cloud ID to Practice Name
-        # Use a dictionary to handle duplicates (keep the first non-empty Practice Name for each Cloud ID)
-        practice_data = {}  # cloud_id -> practice_name
-        for _, row in practice_df.iterrows():
-            cloud_id = row.get('Practice Cloud ID', '')
-            if pd.notna(cloud_id) and cloud_id != '':
-                cloud_id_str = str(cloud_id).strip()
-                # Only add if not already in dictionary
-                if cloud_id_str not in practice_data:
-                    practice_name = ''
-                    if practice_name_column_name:
-                        practice_name = row.get(practice_name_column_name, '')
-                    if pd.notna(practice_name) and practice_name != '':
-                        practice_data[cloud_id_str] = str(practice_name).strip()
-                    else:
-                        practice_data[cloud_id_str] = ''
-        
-        if not practice_data:
-            return False
+        # Read the ValidationAndReference Practice Cloud ID / Practice Name columns once and keep
+        # them in memory ([cloud_id, practice_name] per row from row 2), mirroring every write below
+        max_row = validation_sheet.max_row
+        validation_values = []
+        if max_row > 1:
+            validation_values = [
+                list(row)
+                for row in validation_sheet.iter_rows(
+                    min_row=2, max_row=max_row,
+                    min_col=practice_cloud_id_col_idx, max_col=practice_name_col_idx,
+                    values_only=True
+                )
+            ]
         
-        # Get existing Practice Cloud IDs from ValidationAndReference sheet to avoid duplicates
+        # Get existing Practice Cloud IDs from ValidationAndReference sheet to avoid duplicates,
+        # noting the first empty Practice Cloud ID row in the same pass
         existing_cloud_ids = set()
         existing_cloud_id_to_row = {}  # Map cloud_id to row_idx for updating Practice Name
-        max_row = validation_sheet.max_row
-        if max_row > 1:
-            for row_idx in range(2, max_row + 1):
-                cell = validation_sheet[f"{practice_cloud_id_column}{row_idx}"]
-                if cell.value:
-                    cloud_id_str = str(cell.value).strip()
-                    existing_cloud_ids.add(cloud_id_str)
-                    existing_cloud_id_to_row[cloud_id_str] = row_idx
+        first_empty_row = None
+        for row_idx, (cloud_id_value, _) in enumerate(validation_values, start=2):
+            if cloud_id_value:
+                cloud_id_str = str(cloud_id_value).strip()
+                existing_cloud_ids.add(cloud_id_str)
+                existing_cloud_id_to_row[cloud_id_str] = row_idx
+            if first_empty_row is None and (cloud_id_value is None or str(cloud_id_value).strip() == ''):
+                first_empty_row = row_idx
         
         # Filter out Practice Cloud IDs that already exist
         new_practice_data = {
@@ -151,168 +201,139 @@ def extract_practice_cloud_id_to_template():
             if cloud_id in existing_cloud_ids and practice_name:
                 existing_row_idx = existing_cloud_id_to_row[cloud_id]
                 # Check if Practice Name is missing or empty for this row
-                name_cell = validation_sheet[f"{practice_name_column}{existing_row_idx}"]
-                if not name_cell.value or str(name_cell.value).strip() == '':
-                    name_cell.value = practice_name
+                existing_values = validation_values[existing_row_idx - 2]
+                if not existing_values[1] or str(existing_values[1]).strip() == '':
+                    validation_sheet.cell(row=existing_row_idx, column=practice_name_col_idx, value=practice_name)
+                    existing_values[1] = practice_name
         
         if new_practice_data:
-            # Find the next empty row
-            next_row = max_row + 1
-            
-            # Check if there are empty rows we can use
-            for row_idx in range(2, max_row + 1):
-                cell = validation_sheet[f"{practice_cloud_id_column}{row_idx}"]
-                if cell.value is None or str(cell.value).strip() == '':
-                    next_row = row_idx
-                    break
+            # Start at the first empty row found above, or after the last row
+            next_row = first_empty_row if first_empty_row is not None else max_row + 1
             
             # Write new Practice Cloud IDs and Practice Names to ValidationAndReference sheet
             for i, (cloud_id, practice_name) in enumerate(new_practice_data.items()):
                 row_idx = next_row + i
+                while len(validation_values) < row_idx - 1:
+                    validation_values.append([None, None])
+                row_values = validation_values[row_idx - 2]
                 # Write Practice Cloud ID
-                cell = validation_sheet[f"{practice_cloud_id_column}{row_idx}"]
-                cell.value = cloud_id
+                validation_sheet.cell(row=row_idx, column=practice_cloud_id_col_idx, value=cloud_id)
+                row_values[0] = cloud_id
                 # Write Practice Name
                 if practice_name:
-                    cell = validation_sheet[f"{practice_name_column}{row_idx}"]
-                    cell.value = practice_name
+                    validation_sheet.cell(row=row_idx, column=practice_name_col_idx, value=practice_name)
+                    row_values[1] = practice_name
         
         # Now populate Practice Name in Location sheet based on Practice Cloud ID
         if 'Location' in wb.sheetnames:
             location_sheet = wb['Location']
             
-            # Find Practice Cloud ID column in Location sheet
-            location_practice_cloud_id_column_letter = None
-            location_practice_name_column_letter = None
-            
-            for col_idx, cell in enumerate(location_sheet[header_row], start=1):
-                if cell.value:
-                    cell_value = str(cell.value).strip().lower()
-                    if cell_value == 'practice cloud id':
-                        location_practice_cloud_id_column_letter = get_column_letter(col_idx)
-                    elif cell_value == 'practice name':
-                        location_practice_name_column_letter = get_column_letter(col_idx)
+            # Find Practice Cloud ID and Practice Name columns in Location sheet
+            location_headers = get_header_columns(location_sheet, header_row)
+            location_cloud_id_col_idx = location_headers.get('practice cloud id')
+            location_name_col_idx = location_headers.get('practice name')
             
-            # If Practice Name column doesn't exist, find the next available column after Practice Cloud ID
-            if location_practice_cloud_id_column_letter and not location_practice_name_column_letter:
-                # Find the column after Practice Cloud ID
-                practice_cloud_id_col_num = None
-                for col_idx, cell in enumerate(location_sheet[header_row], start=1):
-                    if cell.value and str(cell.value).strip().lower() == 'practice cloud id':
-                        practice_cloud_id_col_num = col_idx
-                        break
-                
-                if practice_cloud_id_col_num:
-                    location_practice_name_column_letter = get_column_letter(practice_cloud_id_col_num + 1)
-                    # Set header
-                    header_cell = location_sheet[f"{location_practice_name_column_letter}{header_row}"]
-                    header_cell.value = 'Practice Name'
+            # If Practice Name column doesn't exist, use the next column after Practice Cloud ID
+            if location_cloud_id_col_idx and not location_name_col_idx:
+                location_name_col_idx = location_cloud_id_col_idx + 1
+                # Set header
+                header_cell = location_sheet.cell(row=header_row, column=location_name_col_idx)
+                header_cell.value = 'Practice Name'
             
-            # Create lookup dictionary from ValidationAndReference sheet (Practice Cloud ID -> Practice Name)
+            # Create lookup dictionary from the in-memory ValidationAndReference values (Practice Cloud ID -> Practice Name)
             validation_lookup = {}  # cloud_id -> practice_name
-            validation_max_row = validation_sheet.max_row
-            if validation_max_row > 1:
-                for row_idx in range(2, validation_max_row + 1):
-                    cloud_id_cell = validation_sheet[f"{practice_cloud_id_column}{row_idx}"]
-                    name_cell = validation_sheet[f"{practice_name_column}{row_idx}"]
-                    if cloud_id_cell.value:
-                        cloud_id_str = str(cloud_id_cell.value).strip()
-                        practice_name_value = ''
-                        if name_cell.value:
-                            practice_name_value = str(name_cell.value).strip()
-                        validation_lookup[cloud_id_str] = practice_name_value
+            for cloud_id_value, name_value in validation_values:
+                if cloud_id_value:
+                    cloud_id_str = str(cloud_id_value).strip()
+                    practice_name_value = ''
+                    if name_value:
+                        practice_name_value = str(name_value).strip()
+                    validation_lookup[cloud_id_str] = practice_name_value
             
             # Populate Practice Name in Location sheet
-            if location_practice_cloud_id_column_letter and location_practice_name_column_letter:
+            if location_cloud_id_col_idx and location_name_col_idx:
                 location_max_row = location_sheet.max_row
                 has_filled_values = False
-                for row_idx in range(2, location_max_row + 1):
-                    cloud_id_cell = location_sheet[f"{location_practice_cloud_id_column_letter}{row_idx}"]
-                    if cloud_id_cell.value:
-                        cloud_id_str = str(cloud_id_cell.value).strip()
+                # Read both columns once so only rows whose Practice Name changes are written
+                cloud_id_values = location_sheet.iter_rows(
+                    min_row=2, max_row=location_max_row,
+                    min_col=location_cloud_id_col_idx, max_col=location_cloud_id_col_idx,
+                    values_only=True
+                )
+                name_values = location_sheet.iter_rows(
+                    min_row=2, max_row=location_max_row,
+                    min_col=location_name_col_idx, max_col=location_name_col_idx,
+                    values_only=True
+                )
+                for row_idx, ((cloud_id_value,), (current_name_value,)) in enumerate(zip(cloud_id_values, name_values), start=2):
+                    # An existing Practice Name also counts as a filled value
+                    if not has_filled_values and current_name_value and str(current_name_value).strip() != '':
+                        has_filled_values = True
+                    if cloud_id_value:
+                        cloud_id_str = str(cloud_id_value).strip()
                         # Look up Practice Name from ValidationAndReference sheet
                         if cloud_id_str in validation_lookup:
                             practice_name_value = validation_lookup[cloud_id_str]
                             if practice_name_value:
-                                name_cell = location_sheet[f"{location_practice_name_column_letter}{row_idx}"]
-                                name_cell.value = practice_name_value
+                                if current_name_value != practice_name_value:
+                                    location_sheet.cell(row=row_idx, column=location_name_col_idx, value=practice_name_value)
                                 has_filled_values = True
                 
-                # Check if Practice Name column has any filled values and color header green if so
-                if location_practice_name_column_letter:
-                    # Check all rows to see if any have values
-                    if not has_filled_values:
-                        for row_idx in range(2, location_max_row + 1):
-                            name_cell = location_sheet[f"{location_practice_name_column_letter}{row_idx}"]
-                            if name_cell.value and str(name_cell.value).strip() != '':
-                                has_filled_values = True
-                                break
-                    
-                    if has_filled_values:
-                        header_cell = location_sheet[f"{location_practice_name_column_letter}{header_row}"]
-                        header_cell.fill = green_fill
+                # Color the header green if the Practice Name column has any filled values
+                if has_filled_values:
+                    header_cell = location_sheet.cell(row=header_row, column=location_name_col_idx)
+                    header_cell.fill = green_fill
         
         # Now populate Practice Name in Provider sheet based on Practice Cloud ID
         if 'Provider' in wb.sheetnames:
             provider_sheet = wb['Provider']
             
-            # Find Practice Cloud ID column in Provider sheet
-            provider_practice_cloud_id_column_letter = None
-            provider_practice_name_column_letter = None
+            # Find Practice Cloud ID and Practice Name columns in Provider sheet
+            provider_headers = get_header_columns(provider_sheet, header_row)
+            provider_cloud_id_col_idx = provider_headers.get('practice cloud id')
+            provider_name_col_idx = provider_headers.get('practice name')
             
-            for col_idx, cell in enumerate(provider_sheet[header_row], start=1):
-                if cell.value:
-                    cell_value = str(cell.value).strip().lower()
-                    if cell_value == 'practice cloud id':
-                        provider_practice_cloud_id_column_letter = get_column_letter(col_idx)
-                    elif cell_value == 'practice name':
-                        provider_practice_name_column_letter = get_column_letter(col_idx)
-            
-            # If Practice Name column doesn't exist, find the next available column after Practice Cloud ID
-            if provider_practice_cloud_id_column_letter and not provider_practice_name_column_letter:
-                # Find the column after Practice Cloud ID
-                practice_cloud_id_col_num = None
-                for col_idx, cell in enumerate(provider_sheet[header_row], start=1):
-                    if cell.value and str(cell.value).strip().lower() == 'practice cloud id':
-                        practice_cloud_id_col_num = col_idx
-                        break
-                
-                if practice_cloud_id_col_num:
-                    provider_practice_name_column_letter = get_column_letter(practice_cloud_id_col_num + 1)
-                    # Set header
-                    header_cell = provider_sheet[f"{provider_practice_name_column_letter}{header_row}"]
-                    header_cell.value = 'Practice Name'
+            # If Practice Name column doesn't exist, use the next column after Practice Cloud ID
+            if provider_cloud_id_col_idx and not provider_name_col_idx:
+                provider_name_col_idx = provider_cloud_id_col_idx + 1
+                # Set header
+                header_cell = provider_sheet.cell(row=header_row, column=provider_name_col_idx)
+                header_cell.value = 'Practice Name'
             
             # Use the practice_data dictionary already created from Practice_Locations.xlsx
             # Populate Practice Name in Provider sheet
-            if provider_practice_cloud_id_column_letter and provider_practice_name_column_letter:
+            if provider_cloud_id_col_idx and provider_name_col_idx:
                 provider_max_row = provider_sheet.max_row
                 has_filled_values = False
-                for row_idx in range(2, provider_max_row + 1):
-                    cloud_id_cell = provider_sheet[f"{provider_practice_cloud_id_column_letter}{row_idx}"]
-                    if cloud_id_cell.value:
-                        cloud_id_str = str(cloud_id_cell.value).strip()
+                # Read both columns once so only rows whose Practice Name changes are written
+                cloud_id_values = provider_sheet.iter_rows(
+                    min_row=2, max_row=provider_max_row,
+                    min_col=provider_cloud_id_col_idx, max_col=provider_cloud_id_col_idx,
+                    values_only=True
+                )
+                name_values = provider_sheet.iter_rows(
+                    min_row=2, max_row=provider_max_row,
+                    min_col=provider_name_col_idx, max_col=provider_name_col_idx,
+                    values_only=True
+                )
+                for row_idx, ((cloud_id_value,), (current_name_value,)) in enumerate(zip(cloud_id_values, name_values), start=2):
+                    # An existing Practice Name also counts as a filled value
+                    if not has_filled_values and current_name_value and str(current_name_value).strip() != '':
+                        has_filled_values = True
+                    if cloud_id_value:
+                        cloud_id_str = str(cloud_id_value).strip()
                         # Look up Practice Name from practice_data dictionary (from Practice_Locations.xlsx)
                         if cloud_id_str in practice_data:
                             practice_name_value = practice_data[cloud_id_str]
                             if practice_name_value:
-                                name_cell = provider_sheet[f"{provider_practice_name_column_letter}{row_idx}"]
-                                name_cell.value = practice_name_value
+                                if current_name_value != practice_name_value:
+                                    provider_sheet.cell(row=row_idx, column=provider_name_col_idx, value=practice_name_value)
                                 has_filled_values = True
                 
-                # Check if Practice Name column has any filled values and color header green if so
-                if provider_practice_name_column_letter:
-                    # Check all rows to see if any have values
-                    if not has_filled_values:
-                        for row_idx in range(2, provider_max_row + 1):
-                            name_cell = provider_sheet[f"{provider_practice_name_column_letter}{row_idx}"]
-                            if name_cell.value and str(name_cell.value).strip() != '':
-                                has_filled_values = True
-                                break
-                    
-                    if has_filled_values:
-                        header_cell = provider_sheet[f"{provider_practice_name_column_letter}{header_row}"]
-                        header_cell.fill = green_fill
+                # Color the header green if the Practice Name column has any filled values
+                if has_filled_values:
+                    header_cell = provider_sheet.cell(row=header_row, column=provider_name_col_idx)
+                    header_cell.fill = green_fill
         
         # Save the workbook
         wb.save(template_file)
@@ -11,10 +11,10 @@ A border is added to the NPI cell to indicate that it was merged from duplicate
 """
 
 import os
+import re
 from pathlib import Path
 from openpyxl import load_workbook
 from openpyxl.styles import Border, Side
-from openpyxl.utils import get_column_letter
 
 # Get the project root directory (parent of Transposition Logics folder)
 SCRIPT_DIR = Path(__file__).parent
@@ -22,6 +22,9 @@ PROJECT_ROOT = SCRIPT_DIR.parent
 BACKEND_DIR = PROJECT_ROOT / 'backend'
 EXCEL_FILES_DIR = BACKEND_DIR / 'Excel Files'
 
+# Provider headers whose values are merged: "<type>" or "<type> <number>" (lowercase)
+MERGE_HEADER_PATTERN = re.compile(r'(professional suffix|specialty|location id)\s*(\d*)')
+
 
 def normalize_npi(value):
     """
@@ -53,6 +56,22 @@ def normalize_npi(value):
     return normalized
 
 
+def normalize_header(value):
+    """
+    Normalize a header cell value for comparison (stripped and lowercase).
+    Header values are almost always strings, so those skip the str() conversion.
+    
+    Args:
+        value: The header cell value
+        
+    Returns:
+        str: Normalized header, or empty string for an empty cell
+    """
+    if isinstance(value, str):
+        return value.strip().lower()
+    return str(value).strip().lower() if value else ''
+
+
 def get_unique_values(values_list):
     """
     Get unique non-empty values from a list, preserving order
@@ -63,37 +82,44 @@ def get_unique_values(values_list):
     Returns:
         list: List of unique non-empty values
     """
-    seen = set()
-    unique_values = []
+    # Normalized value -> first original value (dicts preserve insertion order)
+    unique_values = {}
     
     for value in values_list:
+        if value is None:
+            continue
         normalized = normalize_npi(value)
-        if normalized and normalized not in seen:
-            seen.add(normalized)
-            unique_values.append(value)  # Keep original value, not normalized
+        if normalized:
+            unique_values.setdefault(normalized, value)  # Keep original value, not normalized
     
-    return unique_values
+    return list(unique_values.values())
 
 
-def merge_duplicate_providers():
+def merge_duplicate_providers(wb=None):
     """
     Merge duplicate providers in Template copy.xlsx based on NPI Number.
     Consolidates unique values from Professional Suffix n, Specialty n, and Location ID n columns.
     Adds a border to the NPI cell to indicate merging.
     
+    Args:
+        wb: Optional already-loaded Template copy.xlsx workbook; when given it
+            is updated in place and the caller is responsible for saving it
+    
     Returns:
         bool: True if successful, False otherwise
     """
     template_file = EXCEL_FILES_DIR / 'Template copy.xlsx'
     
-    # Check if template file exists
-    if not template_file.exists():
+    # Check if template file exists (only needed when loading it here)
+    if wb is None and not template_file.exists():
         print(f"Error: Template copy.xlsx not found at {template_file}")
         return False
     
     try:
-        # Load the template workbook
-        wb = load_workbook(template_file)
+        # Load the template workbook unless the caller shares one (and saves it)
+        save_workbook = wb is None
+        if wb is None:
+            wb = load_workbook(template_file)
         
         # Check if 'Provider' sheet exists
         if 'Provider' not in wb.sheetnames:
@@ -105,87 +131,62 @@ def merge_duplicate_providers():
         header_row = 1
         max_row = provider_sheet.max_row
         
-        # Find column headers
-        npi_column_letter = None
-        professional_suffix_columns = {}  # {1: 'A', 2: 'B', ...}
-        specialty_columns = {}  # {1: 'A', 2: 'B', ...}
-        location_id_columns = {}  # {1: 'A', 2: 'B', ...}
+        # Find column headers (1-based column indices)
+        npi_col_idx = None
+        professional_suffix_columns = {}  # {1: col_idx, 2: col_idx, ...}
+        specialty_columns = {}  # {1: col_idx, 2: col_idx, ...}
+        location_id_columns = {}  # {1: col_idx, 2: col_idx, ...}
+        
+        # Header type -> the column dict it fills
+        merge_columns_by_type = {
+            'professional suffix': professional_suffix_columns,
+            'specialty': specialty_columns,
+            'location id': location_id_columns,
+        }
         
         # Search for headers in the first row
-        for col_idx, cell in enumerate(provider_sheet[header_row], start=1):
-            if cell.value:
-                cell_value = str(cell.value).strip().lower()
+        header_values = next(provider_sheet.iter_rows(min_row=header_row, max_row=header_row, values_only=True), ())
+        for col_idx, header_value in enumerate(header_values, start=1):
+            if header_value:
+                cell_value = normalize_header(header_value)
                 
                 if cell_value == 'npi number':
-                    npi_column_letter = get_column_letter(col_idx)
-                
-                # Find Professional Suffix columns
-                if cell_value.startswith('professional suffix'):
-                    # Extract number from "Professional Suffix 1", "Professional Suffix 2", etc.
-                    if cell_value == 'professional suffix':
-                        professional_suffix_columns[1] = get_column_letter(col_idx)
-                    else:
-                        try:
-                            # Remove "professional suffix" and get the number
-                            number_str = cell_value.replace('professional suffix', '').strip()
-                            if number_str:
-                                number = int(number_str)
-                                professional_suffix_columns[number] = get_column_letter(col_idx)
-                        except:
-                            pass
-                
-                # Find Specialty columns
-                if cell_value.startswith('specialty'):
-                    if cell_value == 'specialty':
-                        specialty_columns[1] = get_column_letter(col_idx)
-                    else:
-                        try:
-                            number_str = cell_value.replace('specialty', '').strip()
-                            if number_str:
-                                number = int(number_str)
-                                specialty_columns[number] = get_column_letter(col_idx)
-                        except:
-                            pass
+                    npi_col_idx = col_idx
+                    continue
                 
-                # Find Location ID columns
-                if cell_value.startswith('location id'):
-                    if cell_value == 'location id':
-                        location_id_columns[1] = get_column_letter(col_idx)
-                    else:
-                        try:
-                            number_str = cell_value.replace('location id', '').strip()
-                            if number_str:
-                                number = int(number_str)
-                                location_id_columns[number] = get_column_letter(col_idx)
-                        except:
-                            pass
+                # Find Professional Suffix n, Specialty n and Location ID n columns
+                # ("Specialty" alone counts as "Specialty 1")
+                match = MERGE_HEADER_PATTERN.fullmatch(cell_value)
+                if match:
+                    column_type, number_str = match.groups()
+                    merge_columns_by_type[column_type][int(number_str) if number_str else 1] = col_idx
         
         # Check if NPI column was found
-        if npi_column_letter is None:
+        if npi_col_idx is None:
             print("Error: 'NPI Number' column not found in Provider sheet")
             return False
         
-        # Find maximum column numbers for each type
-        max_prof_suffix = max(professional_suffix_columns.keys()) if professional_suffix_columns else 0
-        max_specialty = max(specialty_columns.keys()) if specialty_columns else 0
-        max_location_id = max(location_id_columns.keys()) if location_id_columns else 0
+        # (number, col_idx) pairs of each type in column-number order (numbers start at 1)
+        prof_suffix_cols_sorted = sorted((num, col_idx) for num, col_idx in professional_suffix_columns.items() if num >= 1)
+        specialty_cols_sorted = sorted((num, col_idx) for num, col_idx in specialty_columns.items() if num >= 1)
+        location_id_cols_sorted = sorted((num, col_idx) for num, col_idx in location_id_columns.items() if num >= 1)
         
-        # Build a dictionary to group rows by NPI
-        npi_to_rows = {}
+        # Read the Provider rows into memory once (values only, no Cell objects);
+        # rows[row_idx - 2][col_idx - 1] is the value at (row_idx, col_idx)
+        rows = [list(row) for row in provider_sheet.iter_rows(min_row=2, max_row=max_row, values_only=True)]
         
-        # Collect all rows with their NPI values
-        for row_idx in range(2, max_row + 1):  # Start from row 2 (skip header)
-            npi_cell = provider_sheet[f"{npi_column_letter}{row_idx}"]
-            npi_value = npi_cell.value
-            npi_key = normalize_npi(npi_value)
-            
-            if npi_key:  # Only process rows with NPI
-                if npi_key not in npi_to_rows:
-                    npi_to_rows[npi_key] = []
-                npi_to_rows[npi_key].append(row_idx)
+        # Normalize the whole NPI column in one pass
+        npi_keys = [normalize_npi(row[npi_col_idx - 1]) for row in rows]
         
-        # Find duplicates (NPIs with more than one row)
-        duplicates = {npi: rows for npi, rows in npi_to_rows.items() if len(rows) > 1}
+        # Find duplicates (NPIs with more than one row) in a single pass; only NPIs seen
+        # again get a row list, starting with the row they first appeared on
+        first_row_by_npi = {}
+        duplicates = {}
+        for row_idx, npi_key in enumerate(npi_keys, start=2):  # Start from row 2 (skip header)
+            if npi_key:  # Only process rows with NPI
+                first_row = first_row_by_npi.setdefault(npi_key, row_idx)
+                if first_row != row_idx:
+                    duplicates.setdefault(npi_key, [first_row]).append(row_idx)
         
         if not duplicates:
             print("No duplicate providers found based on NPI Number")
@@ -203,100 +204,74 @@ def merge_duplicate_providers():
         rows_to_delete = []
         
         for npi_key, row_indices in duplicates.items():
-            # Sort row indices to keep the first one
-            row_indices.sort()
+            # Row indices are collected in ascending order, so the first one is kept
             keep_row = row_indices[0]  # Keep the first row
             merge_rows = row_indices[1:]  # Merge these rows into the first
             
-            # Collect all values from merge_rows
+            # Collect all values from keep_row and merge_rows (keep_row first)
             prof_suffix_values = []
             specialty_values = []
             location_id_values = []
             
-            # First, get values from the keep_row
-            for num in range(1, max_prof_suffix + 1):
-                if num in professional_suffix_columns:
-                    cell = provider_sheet[f"{professional_suffix_columns[num]}{keep_row}"]
-                    if cell.value:
-                        prof_suffix_values.append(cell.value)
-            
-            for num in range(1, max_specialty + 1):
-                if num in specialty_columns:
-                    cell = provider_sheet[f"{specialty_columns[num]}{keep_row}"]
-                    if cell.value:
-                        specialty_values.append(cell.value)
-            
-            for num in range(1, max_location_id + 1):
-                if num in location_id_columns:
-                    cell = provider_sheet[f"{location_id_columns[num]}{keep_row}"]
-                    if cell.value:
-                        location_id_values.append(cell.value)
-            
-            # Then, get values from merge_rows
-            for merge_row in merge_rows:
-                for num in range(1, max_prof_suffix + 1):
-                    if num in professional_suffix_columns:
-                        cell = provider_sheet[f"{professional_suffix_columns[num]}{merge_row}"]
-                        if cell.value:
-                            prof_suffix_values.append(cell.value)
+            for row_idx in row_indices:
+                row = rows[row_idx - 2]
+                
+                for _, col_idx in prof_suffix_cols_sorted:
+                    value = row[col_idx - 1]
+                    if value:
+                        prof_suffix_values.append(value)
                 
-                for num in range(1, max_specialty + 1):
-                    if num in specialty_columns:
-                        cell = provider_sheet[f"{specialty_columns[num]}{merge_row}"]
-                        if cell.value:
-                            specialty_values.append(cell.value)
+                for _, col_idx in specialty_cols_sorted:
+                    value = row[col_idx - 1]
+                    if value:
+                        specialty_values.append(value)
                 
-                for num in range(1, max_location_id + 1):
-                    if num in location_id_columns:
-                        cell = provider_sheet[f"{location_id_columns[num]}{merge_row}"]
-                        if cell.value:
-                            location_id_values.append(cell.value)
+                for _, col_idx in location_id_cols_sorted:
+                    value = row[col_idx - 1]
+                    if value:
+                        location_id_values.append(value)
             
             # Get unique values
             unique_prof_suffix = get_unique_values(prof_suffix_values)
             unique_specialty = get_unique_values(specialty_values)
             unique_location_id = get_unique_values(location_id_values)
             
-            # Clear existing values in keep_row
-            for num in range(1, max_prof_suffix + 1):
-                if num in professional_suffix_columns:
-                    provider_sheet[f"{professional_suffix_columns[num]}{keep_row}"].value = None
-            
-            for num in range(1, max_specialty + 1):
-                if num in specialty_columns:
-                    provider_sheet[f"{specialty_columns[num]}{keep_row}"].value = None
-            
-            for num in range(1, max_location_id + 1):
-                if num in location_id_columns:
-                    provider_sheet[f"{location_id_columns[num]}{keep_row}"].value = None
-            
-            # Write unique values to keep_row, distributing across columns
-            for idx, value in enumerate(unique_prof_suffix, start=1):
-                if idx <= max_prof_suffix and idx in professional_suffix_columns:
-                    provider_sheet[f"{professional_suffix_columns[idx]}{keep_row}"].value = value
-            
-            for idx, value in enumerate(unique_specialty, start=1):
-                if idx <= max_specialty and idx in specialty_columns:
-                    provider_sheet[f"{specialty_columns[idx]}{keep_row}"].value = value
-            
-            for idx, value in enumerate(unique_location_id, start=1):
-                if idx <= max_location_id and idx in location_id_columns:
-                    provider_sheet[f"{location_id_columns[idx]}{keep_row}"].value = value
+            # Rewrite keep_row with the unique values distributed across columns (the rest cleared),
+            # writing only the cells whose value changes
+            keep_row_values = rows[keep_row - 2]
+            for cols_sorted, unique_values in (
+                (prof_suffix_cols_sorted, unique_prof_suffix),
+                (specialty_cols_sorted, unique_specialty),
+                (location_id_cols_sorted, unique_location_id),
+            ):
+                for num, col_idx in cols_sorted:
+                    value = unique_values[num - 1] if num <= len(unique_values) else None
+                    if keep_row_values[col_idx - 1] != value:
+                        keep_row_values[col_idx - 1] = value
+                        provider_sheet.cell(row=keep_row, column=col_idx, value=value)
             
             # Add border to NPI cell
-            npi_cell = provider_sheet[f"{npi_column_letter}{keep_row}"]
-            npi_cell.border = border
+            provider_sheet.cell(row=keep_row, column=npi_col_idx).border = border
             
             # Mark merge_rows for deletion
             rows_to_delete.extend(merge_rows)
         
-        # Delete duplicate rows (in reverse order to maintain row indices)
-        rows_to_delete.sort(reverse=True)
+        # Group duplicate rows into runs of consecutive rows ([first row, row count])
+        rows_to_delete.sort()
+        delete_runs = []
         for row_idx in rows_to_delete:
-            provider_sheet.delete_rows(row_idx)
+            if delete_runs and delete_runs[-1][0] + delete_runs[-1][1] == row_idx:
+                delete_runs[-1][1] += 1
+            else:
+                delete_runs.append([row_idx, 1])
+        
+        # Delete each run with a single call (in reverse order to maintain row indices)
+        for first_row, row_count in reversed(delete_runs):
+            provider_sheet.delete_rows(first_row, row_count)
         
         # Save the workbook
-        wb.save(template_file)
+        if save_workbook:
+            wb.save(template_file)
         return True
         
     except Exception as e:
@@ -10,13 +10,14 @@ Slash ('/') is part of specialty names.
 It also changes the header colors to green.
 """
 
+import importlib.util
 import os
 import re
+from bisect import bisect_left
 from pathlib import Path
 import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
-from openpyxl.utils import get_column_letter
 
 # Get the project root directory (parent of Transposition Logics folder)
 SCRIPT_DIR = Path(__file__).parent
@@ -24,6 +25,99 @@ PROJECT_ROOT = SCRIPT_DIR.parent
 BACKEND_DIR = PROJECT_ROOT / 'backend'
 EXCEL_FILES_DIR = BACKEND_DIR / 'Excel Files'
 
+# pandas only has a calamine engine from 2.2 on (requirements.txt pins pandas 2.1.4)
+CALAMINE_MIN_PANDAS_VERSION = (2, 2)
+
+def calamine_engine_available():
+    """
+    Check whether pandas can read Excel files with the calamine engine.
+    
+    Returns:
+        bool: True if python-calamine is installed and pandas is 2.2 or newer
+    """
+    if importlib.util.find_spec('python_calamine') is None:
+        return False
+    pandas_version = tuple(int(part) for part in pd.__version__.split('.')[:2])
+    return pandas_version >= CALAMINE_MIN_PANDAS_VERSION
+
+# Use the Rust-based calamine reader when pandas supports it and python-calamine is installed
+CALAMINE_AVAILABLE = calamine_engine_available()
+
+# Strings pandas.read_excel treats as missing by default (its na_values)
+PANDAS_NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
+
+# Fills shared by every highlighted cell: grey for invalid/corrected/derived values, green for headers
+GREY_FILL = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+GREEN_FILL = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")
+
+def read_excel_column(excel_file, column_name):
+    """
+    Read a single column from the first sheet of an Excel file.
+    Uses pandas with the calamine engine when available (parsing only this column),
+    otherwise openpyxl in read-only mode. Either way rows line up with
+    pandas.read_excel: the first row is the header, blank rows inside the data
+    are kept as None, trailing blank rows are dropped and pandas' default NA
+    strings are returned as None.
+    
+    Returns:
+        list: The column values, or None if the column is not in the header row
+    """
+    if CALAMINE_AVAILABLE:
+        column_df = pd.read_excel(excel_file, usecols=lambda column: column == column_name, engine='calamine')
+        if column_name not in column_df.columns:
+            return None
+        column = column_df[column_name]
+        return column.astype(object).where(column.notna(), None).tolist()
+    
+    wb = load_workbook(excel_file, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = wb.worksheets[0]
+        # The stored dimensions can be wrong, so read until the last row in the file
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows(values_only=True)
+        
+        header = next(rows, ())
+        if column_name not in header:
+            return None
+        column_idx = header.index(column_name)
+        
+        column_values = []
+        rows_with_data = 0
+        for row in rows:
+            value = row[column_idx] if column_idx < len(row) else None
+            if isinstance(value, str) and value in PANDAS_NA_STRINGS:
+                value = None
+            column_values.append(value)
+            if any(cell is not None and cell != '' for cell in row):
+                rows_with_data = len(column_values)
+        
+        # Like pandas, drop the blank rows after the last row with data
+        del column_values[rows_with_data:]
+        return column_values
+    finally:
+        wb.close()
+
+def normalize_header(value):
+    """
+    Normalize a header cell value for comparison (stripped and lowercase).
+    Header values are almost always strings, so those skip the str() conversion.
+    
+    Args:
+        value: The header cell value
+        
+    Returns:
+        str: Normalized header, or empty string for an empty cell
+    """
+    if isinstance(value, str):
+        return value.strip().lower()
+    return str(value).strip().lower() if value else ''
+
+# Matches every punctuation/space character removed by normalize_specialty
+NON_WORD_PATTERN = re.compile(r'[^\w]')
+
 def normalize_specialty(specialty_str):
     """
     Normalize a specialty string by removing punctuation, spaces, and converting to uppercase.
@@ -32,10 +126,26 @@ def normalize_specialty(specialty_str):
     if not specialty_str:
         return ""
     # Remove all punctuation and spaces, convert to uppercase
-    normalized = re.sub(r'[^\w]', '', str(specialty_str).upper())
+    normalized = NON_WORD_PATTERN.sub('', str(specialty_str).upper())
     return normalized
 
-def find_close_match(value, valid_specialties):
+def build_specialty_lookup(valid_specialties):
+    """
+    Precompute the forms of the valid specialties that find_close_match compares against,
+    so they are built once instead of for every value checked.
+    
+    Returns:
+        tuple: (set of lowercase valid specialties, {normalized specialty: valid specialty},
+               sorted list of normalized specialties) where the dict keeps the first valid
+               specialty for each normalized form and the sorted list backs the prefix search
+    """
+    lowercase_specialties = {str(valid_specialty).strip().lower() for valid_specialty in valid_specialties}
+    normalized_specialties = {}
+    for valid_specialty in valid_specialties:
+        normalized_specialties.setdefault(normalize_specialty(valid_specialty), valid_specialty)
+    return lowercase_specialties, normalized_specialties, sorted(normalized_specialties)
+
+def find_close_match(value, valid_specialties, specialty_lookup=None):
     """
     Find a close match for a value in the valid specialties list.
     Returns the original valid specialty if a close match is found, None otherwise.
@@ -43,34 +153,97 @@ def find_close_match(value, valid_specialties):
     1. Exact match (case-insensitive) - no replacement needed
     2. Normalized match (without punctuation/spaces) - e.g., "Cardio logy" matches "Cardiology"
     3. Prefix match - e.g., "ABC" matches "ABCd"
+    
+    Pass specialty_lookup (from build_specialty_lookup) when checking many values
+    against the same valid specialties.
     """
     if not value or not valid_specialties:
         return None
     
-    normalized_value = normalize_specialty(value)
+    if specialty_lookup is None:
+        specialty_lookup = build_specialty_lookup(valid_specialties)
+    lowercase_specialties, normalized_specialties, sorted_normalized = specialty_lookup
     
     # First check exact match (case-insensitive)
-    for valid_specialty in valid_specialties:
-        if str(value).strip().lower() == str(valid_specialty).strip().lower():
-            return None  # Exact match, no need to replace
+    if str(value).strip().lower() in lowercase_specialties:
+        return None  # Exact match, no need to replace
     
     # Check normalized match (without punctuation/spaces)
-    for valid_specialty in valid_specialties:
-        normalized_valid = normalize_specialty(valid_specialty)
-        if normalized_value == normalized_valid:
-            return valid_specialty  # Close match found, return the valid version
+    normalized_value = normalize_specialty(value)
+    valid_specialty = normalized_specialties.get(normalized_value)
+    if valid_specialty is not None:
+        return valid_specialty  # Close match found, return the valid version
     
     # Check if normalized input is a prefix of any normalized valid specialty
     # Only match if the input is at least 2 characters to avoid too broad matches
     if len(normalized_value) >= 2:
-        for valid_specialty in valid_specialties:
-            normalized_valid = normalize_specialty(valid_specialty)
-            # Check if input is a prefix of valid specialty
-            if normalized_valid.startswith(normalized_value):
-                return valid_specialty  # Prefix match found, return the valid version
+        # Any valid specialty starting with the input sorts right at its insertion point,
+        # so the smallest such specialty is the only one that needs checking
+        index = bisect_left(sorted_normalized, normalized_value)
+        if index < len(sorted_normalized) and sorted_normalized[index].startswith(normalized_value):
+            return normalized_specialties[sorted_normalized[index]]  # Prefix match found, return the valid version
     
     return None
 
+# Specialty names whose commas are part of the name rather than separators
+SPECIALTY_EXCEPTION_PHRASES = (
+    'Ear, Nose & Throat Doctor',
+    'Ophthalmic Plastic, Orbital & Reconstructive Surgeon'
+)
+
+# Each exception phrase with the offset of the comma it contains, so a comma can be
+# checked for belonging to an exception phrase with a single startswith
+SPECIALTY_EXCEPTION_COMMAS = tuple((phrase, phrase.index(',')) for phrase in SPECIALTY_EXCEPTION_PHRASES)
+
+# Specialty 1-5 parts for a value with no specialties
+EMPTY_SPECIALTY_PARTS = (None, None, None, None, None)
+
+def split_specialty_string(specialty_str):
+    """
+    Split specialty string by '+', ';', or ',' 
+    Exceptions: Preserve commas in 'Ear, Nose & Throat Doctor' and 
+    'Ophthalmic Plastic, Orbital & Reconstructive Surgeon'
+    
+    Returns:
+        tuple: Exactly 5 specialty parts, padded with None
+    """
+    if not specialty_str:
+        return EMPTY_SPECIALTY_PARTS
+    specialty_str = str(specialty_str).strip()
+    
+    # Split by the first separator present ('+' before ';' before ',')
+    if '+' in specialty_str:
+        parts = specialty_str.split('+')
+    elif ';' in specialty_str:
+        parts = specialty_str.split(';')
+    else:
+        # Split on commas, stepping over the comma inside any exception phrase
+        parts = []
+        part_start = 0
+        search_start = 0
+        while True:
+            comma_idx = specialty_str.find(',', search_start)
+            if comma_idx == -1:
+                break
+            for phrase, comma_offset in SPECIALTY_EXCEPTION_COMMAS:
+                phrase_start = comma_idx - comma_offset
+                if phrase_start >= 0 and specialty_str.startswith(phrase, phrase_start):
+                    search_start = phrase_start + len(phrase)
+                    break
+            else:
+                parts.append(specialty_str[part_start:comma_idx])
+                part_start = search_start = comma_idx + 1
+        parts.append(specialty_str[part_start:])
+    
+    if len(parts) > 1:
+        parts = [part.strip() or None for part in parts]
+    else:
+        # No separator found, treat entire string as one specialty
+        parts = [specialty_str] if specialty_str else [None]
+    
+    # Take only first 5 parts and pad with None if needed
+    return (*parts[:5], *EMPTY_SPECIALTY_PARTS[len(parts):])
+
 def extract_specialty_to_template():
     """
     Extract Specialty column from _Mapped.xlsx and write to Template copy.xlsx
@@ -95,23 +268,18 @@ def extract_specialty_to_template():
         return False
     
     try:
-        # Read the Specialty column from _Mapped.xlsx
-        mapped_df = pd.read_excel(source_file)
+        # Read the Specialty column from _Mapped.xlsx (read-only, just this column)
+        specialty_data = read_excel_column(source_file, 'Specialty')
         
         # Check if 'Specialty' column exists
-        if 'Specialty' not in mapped_df.columns:
+        if specialty_data is None:
             return False
         
-        # Extract the Specialty column
-        specialty_data = mapped_df['Specialty'].tolist()
-        
         # Read Specialty Derived column from NPI-Extracts.xlsx as fallback
         specialty_derived_data = []
         if npi_extracts_file.exists():
             try:
-                npi_extracts_df = pd.read_excel(npi_extracts_file)
-                if 'Specialty Derived' in npi_extracts_df.columns:
-                    specialty_derived_data = npi_extracts_df['Specialty Derived'].tolist()
+                specialty_derived_data = read_excel_column(npi_extracts_file, 'Specialty Derived') or []
             except:
                 pass  # If file doesn't exist or column not found, continue without it
         
@@ -130,182 +298,112 @@ def extract_specialty_to_template():
         specialty_columns = {}
         
         # Search for the headers in the first row
-        for col_idx, cell in enumerate(provider_sheet[header_row], start=1):
-            if cell.value:
-                cell_value = str(cell.value).strip().lower()
+        header_values = next(provider_sheet.iter_rows(min_row=header_row, max_row=header_row, values_only=True), ())
+        for col_idx, header_value in enumerate(header_values, start=1):
+            if header_value:
+                cell_value = normalize_header(header_value)
                 if cell_value == 'specialty 1':
-                    specialty_columns[1] = get_column_letter(col_idx)
+                    specialty_columns[1] = col_idx
                 elif cell_value == 'specialty 2':
-                    specialty_columns[2] = get_column_letter(col_idx)
+                    specialty_columns[2] = col_idx
                 elif cell_value == 'specialty 3':
-                    specialty_columns[3] = get_column_letter(col_idx)
+                    specialty_columns[3] = col_idx
                 elif cell_value == 'specialty 4':
-                    specialty_columns[4] = get_column_letter(col_idx)
+                    specialty_columns[4] = col_idx
                 elif cell_value == 'specialty 5':
-                    specialty_columns[5] = get_column_letter(col_idx)
+                    specialty_columns[5] = col_idx
         
         if 1 not in specialty_columns:
             return False
         
+        # (index into the split specialty parts, column index) for each Specialty 1-5 column present
+        specialty_column_items = [(i - 1, specialty_columns[i]) for i in range(1, 6) if i in specialty_columns]
+        
         # Load valid specialties from ValidationAndReference sheet
         valid_specialties = set()
         if 'ValidationAndReference' in wb.sheetnames:
             validation_sheet = wb['ValidationAndReference']
-            specialty_column_letter = None
+            specialty_col_idx = None
             
             # Find the 'Specialty Name' column in ValidationAndReference sheet
-            for col_idx, cell in enumerate(validation_sheet[header_row], start=1):
-                if cell.value and str(cell.value).strip().lower() == 'specialty name':
-                    specialty_column_letter = get_column_letter(col_idx)
+            header_values = next(validation_sheet.iter_rows(min_row=header_row, max_row=header_row, values_only=True), ())
+            for col_idx, header_value in enumerate(header_values, start=1):
+                if header_value and normalize_header(header_value) == 'specialty name':
+                    specialty_col_idx = col_idx
                     break
             
             # Read all valid specialty values
-            if specialty_column_letter:
-                max_row = validation_sheet.max_row
-                for row_idx in range(2, max_row + 1):  # Start from row 2 (skip header)
-                    cell = validation_sheet[f"{specialty_column_letter}{row_idx}"]
-                    if cell.value:
-                        valid_specialties.add(str(cell.value).strip())
+            if specialty_col_idx:
+                for (specialty_name,) in validation_sheet.iter_rows(
+                    min_row=2, min_col=specialty_col_idx, max_col=specialty_col_idx, values_only=True
+                ):  # Start from row 2 (skip header)
+                    if specialty_name:
+                        valid_specialties.add(str(specialty_name).strip())
         
-        # Grey fill for invalid values
-        grey_fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+        # Normalize the valid specialties once for all close-match checks
+        specialty_lookup = build_specialty_lookup(valid_specialties)
+        # Close-match result per distinct specialty value, as the same specialties repeat across providers
+        close_matches = {}
         
-        # Process and write the Specialty data
+        # Resolve the Specialty data first, keeping (column index, value, highlight) for each
+        # Specialty column per row, then write it all to the sheet in one pass below
+        specialty_rows = []
+        # Resolved cells per distinct (specialty string, using Specialty Derived), as the same
+        # specialty strings repeat across providers and only need splitting and matching once
+        resolved_by_specialty = {}
         for row_idx, specialty_value in enumerate(specialty_data, start=2):
             # Check if Specialty value is empty, if so use Specialty Derived as fallback
             data_index = row_idx - 2  # Convert to 0-based index for accessing specialty_derived_data
-            # Helper function to split specialty string by '+', ';', or ',' (with exceptions)
-            def split_specialty_string(specialty_str):
-                """
-                Split specialty string by '+', ';', or ',' 
-                Exceptions: Preserve commas in 'Ear, Nose & Throat Doctor' and 
-                'Ophthalmic Plastic, Orbital & Reconstructive Surgeon'
-                """
-                if not specialty_str:
-                    return [None, None, None, None, None]
-                specialty_str = str(specialty_str).strip()
-                
-                # Exception phrases that should preserve commas
-                exception_phrases = [
-                    'Ear, Nose & Throat Doctor',
-                    'Ophthalmic Plastic, Orbital & Reconstructive Surgeon'
-                ]
-                
-                # Replace exception phrases with placeholders to protect commas
-                placeholder_map = {}
-                protected_str = specialty_str
-                for i, phrase in enumerate(exception_phrases):
-                    placeholder = f'__EXCEPTION_{i}__'
-                    if phrase in protected_str:
-                        protected_str = protected_str.replace(phrase, placeholder)
-                        placeholder_map[placeholder] = phrase
-                
-                # Now split by separators
-                parts = []
-                if '+' in protected_str:
-                    parts = [part.strip() if part.strip() else None for part in protected_str.split('+')]
-                elif ';' in protected_str:
-                    parts = [part.strip() if part.strip() else None for part in protected_str.split(';')]
-                elif ',' in protected_str:
-                    parts = [part.strip() if part.strip() else None for part in protected_str.split(',')]
-                else:
-                    # No separator found, treat entire string as one specialty
-                    parts = [protected_str] if protected_str else [None]
-                
-                # Restore exception phrases from placeholders
-                restored_parts = []
-                for part in parts:
-                    if part:
-                        # Check if this part contains a placeholder
-                        for placeholder, original_phrase in placeholder_map.items():
-                            if placeholder in part:
-                                part = part.replace(placeholder, original_phrase)
-                        restored_parts.append(part)
-                    else:
-                        restored_parts.append(None)
-                
-                # Take only first 5 parts and pad with None if needed
-                specialty_parts = restored_parts[:5]
-                while len(specialty_parts) < 5:
-                    specialty_parts.append(None)
-                return specialty_parts
-            
-            # Track if we're using Specialty Derived or if values are split
+            # Track if we're using Specialty Derived
             using_specialty_derived = False
-            has_multiple_values = False
             
-            if pd.isna(specialty_value) or (isinstance(specialty_value, str) and not specialty_value.strip()):
+            # read_excel_column returns missing values as None, so no pd.isna check is needed
+            specialty_str = '' if specialty_value is None else str(specialty_value).strip()
+            if not specialty_str:
                 # Use Specialty Derived if available
-                if specialty_derived_data and data_index < len(specialty_derived_data):
+                specialty_derived_value = None
+                if data_index < len(specialty_derived_data):
                     specialty_derived_value = specialty_derived_data[data_index]
-                    if not pd.isna(specialty_derived_value) and specialty_derived_value:
-                        # Split Specialty Derived value (can contain '+' or ';' separators)
-                        specialty_parts = split_specialty_string(specialty_derived_value)
-                        using_specialty_derived = True
-                        # Check if there are multiple values
-                        non_empty_count = sum(1 for p in specialty_parts if p is not None)
-                        has_multiple_values = non_empty_count > 1
-                    else:
-                        specialty_parts = [None, None, None, None, None]
-                else:
-                    specialty_parts = [None, None, None, None, None]
-            else:
-                specialty_str = str(specialty_value).strip()
-                if not specialty_str:
-                    # Check Specialty Derived as fallback
-                    if specialty_derived_data and data_index < len(specialty_derived_data):
-                        specialty_derived_value = specialty_derived_data[data_index]
-                        if not pd.isna(specialty_derived_value) and specialty_derived_value:
-                            # Split Specialty Derived value (can contain '+' or ';' separators)
-                            specialty_parts = split_specialty_string(specialty_derived_value)
-                            using_specialty_derived = True
-                            # Check if there are multiple values
-                            non_empty_count = sum(1 for p in specialty_parts if p is not None)
-                            has_multiple_values = non_empty_count > 1
-                        else:
-                            specialty_parts = [None, None, None, None, None]
-                    else:
-                        specialty_parts = [None, None, None, None, None]
-                else:
-                    # Split by '+', ';', or ',' (with exceptions for certain specialty names)
-                    specialty_parts = split_specialty_string(specialty_str)
-                    # Check if there are multiple values
-                    non_empty_count = sum(1 for p in specialty_parts if p is not None)
-                    has_multiple_values = non_empty_count > 1
+                if specialty_derived_value:
+                    specialty_str = str(specialty_derived_value).strip()
+                    using_specialty_derived = True
             
-            # Write to Specialty 1 through 5
-            for i in range(1, 6):
-                if i in specialty_columns:
-                    cell = provider_sheet[f"{specialty_columns[i]}{row_idx}"]
-                    value = specialty_parts[i-1] if specialty_parts[i-1] else None
+            resolved_cells = resolved_by_specialty.get((specialty_str, using_specialty_derived))
+            if resolved_cells is None:
+                # Split by '+', ';', or ',' (with exceptions for certain specialty names)
+                specialty_parts = split_specialty_string(specialty_str)
+                
+                # Highlight every part if using Specialty Derived or there are multiple values
+                # (more than one of the 5 parts is set)
+                highlight_all_parts = using_specialty_derived or specialty_parts.count(None) < 4
+                
+                # Resolve Specialty 1 through 5
+                resolved_cells = []
+                for part_index, col_idx in specialty_column_items:
+                    value = specialty_parts[part_index] or None
                     
-                    # Check for close match and replace if found
-                    if value and valid_specialties:
-                        close_match = find_close_match(value, valid_specialties)
-                        if close_match:
-                            cell.value = close_match
-                            cell.fill = grey_fill  # Highlight corrected values
-                        elif value not in valid_specialties:
-                            cell.value = value
-                            cell.fill = grey_fill  # Highlight invalid values
-                        else:
-                            cell.value = value
-                            # Highlight if using Specialty Derived or has multiple values
-                            if using_specialty_derived or has_multiple_values:
-                                cell.fill = grey_fill
+                    # Valid values are kept as they are; otherwise check for close match and replace if found,
+                    # highlighting corrected and invalid values
+                    if value and valid_specialties and value not in valid_specialties:
+                        if value not in close_matches:
+                            close_matches[value] = find_close_match(value, valid_specialties, specialty_lookup)
+                        resolved_cells.append((col_idx, close_matches[value] or value, True))
                     else:
-                        cell.value = value
-                        # Highlight if using Specialty Derived or has multiple values
-                        if using_specialty_derived or has_multiple_values:
-                            cell.fill = grey_fill
+                        resolved_cells.append((col_idx, value, highlight_all_parts))
+                resolved_by_specialty[(specialty_str, using_specialty_derived)] = resolved_cells
+            specialty_rows.append(resolved_cells)
         
-        # Color the header cells green
-        green_fill = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")
+        # Write the resolved Specialty values to the Provider sheet
+        for row_idx, resolved_cells in enumerate(specialty_rows, start=2):
+            for col_idx, value, highlight in resolved_cells:
+                cell = provider_sheet.cell(row=row_idx, column=col_idx)
+                cell.value = value
+                if highlight:
+                    cell.fill = GREY_FILL
         
-        for i in range(1, 6):
-            if i in specialty_columns:
-                header = provider_sheet[f"{specialty_columns[i]}{header_row}"]
-                header.fill = green_fill
+        # Color the header cells green
+        for _, col_idx in specialty_column_items:
+            provider_sheet.cell(row=header_row, column=col_idx).fill = GREEN_FILL
         
         # Save the workbook
         wb.save(template_file)
@@ -3,10 +3,15 @@ Flask Backend for PDO Data Transposition
 This will handle Excel processing, column detection, API calls, and output generation.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Request, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import os
+import io
 import json as json_lib
+import re
+import uuid
+from collections import deque
 from pathlib import Path
 from dotenv import load_dotenv
 import sys
@@ -15,8 +20,12 @@ from werkzeug.utils import secure_filename
 
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)  # Allow React frontend to make requests
+# Use the Rust-based orjson encoder for JSON requests and responses when it is installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Add Logics folder to Python path
 backend_dir = Path(__file__).parent
@@ -24,6 +33,157 @@ project_root = backend_dir.parent
 logics_dir = project_root / 'Logics'
 sys.path.insert(0, str(logics_dir))
 
+# Add Transposition Logics folder to Python path once, for the modules main.py imports
+transposition_logics_dir = project_root / 'Transposition Logics'
+sys.path.insert(0, str(transposition_logics_dir))
+
+# Folder the uploaded and generated Excel files are kept in
+excel_files_dir = backend_dir / 'Excel Files'
+
+# userInfo.json holding the email and role used for the Snowflake connection
+user_info_path = project_root / 'src' / 'data' / 'userInfo.json'
+
+# Suffix of the files /api/convert uploads are spooled to inside Excel Files
+UPLOAD_SPOOL_SUFFIX = '.upload'
+
+# Characters not allowed in a packed template file name
+INVALID_FILE_NAME_PATTERN = re.compile(r'[<>:"/\\|?*]')
+
+# Logics modules already executed in this process: module name -> (file mtime, module)
+loaded_logics_modules = {}
+
+def load_logics_module(module_name):
+    """
+    Load a module from the Logics folder, executing the file only on first use
+    or after it has changed on disk.
+    
+    Args:
+        module_name: File name of the module without the .py extension
+    
+    Returns:
+        module: The loaded module
+    """
+    module_path = logics_dir / f'{module_name}.py'
+    module_mtime = module_path.stat().st_mtime
+    cached = loaded_logics_modules.get(module_name)
+    if cached is not None and cached[0] == module_mtime:
+        return cached[1]
+    
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    loaded_logics_modules[module_name] = (module_mtime, module)
+    return module
+
+# userInfo.json contents last read or written by this process: path -> (file mtime_ns, file size, user info)
+user_info_cache = {}
+
+def read_user_info(user_info_path):
+    """
+    Read userInfo.json, parsing the file only when it has changed since it was
+    last read or written by this process.
+    
+    Args:
+        user_info_path: Path to userInfo.json
+    
+    Returns:
+        dict: The user info
+    """
+    file_stat = user_info_path.stat()
+    cached = user_info_cache.get(user_info_path)
+    if cached is not None and cached[:2] == (file_stat.st_mtime_ns, file_stat.st_size):
+        return cached[2]
+    
+    with open(user_info_path, 'r') as f:
+        user_info = json_lib.load(f)
+    user_info_cache[user_info_path] = (file_stat.st_mtime_ns, file_stat.st_size, user_info)
+    return user_info
+
+class UploadRequest(Request):
+    """
+    Request that spools files uploaded to /api/convert into Excel Files, rather than memory
+    or the system temp dir, so the upload can be moved into place as Input.xlsx instead of
+    copied. Uploads to any other endpoint are handled the default way.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_spool_paths = []
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint != 'convert_mappings':
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        excel_files_dir.mkdir(parents=True, exist_ok=True)
+        spool_path = str(excel_files_dir / f'{uuid.uuid4().hex}{UPLOAD_SPOOL_SUFFIX}')
+        # Created like any other file (umask permissions, no delete-on-close), so it can be renamed
+        spool_file = open(spool_path, 'xb+')
+        self.upload_spool_paths.append(spool_path)
+        return spool_file
+    
+    def close(self):
+        """Close the uploaded files and remove any spool file that was not moved into place"""
+        super().close()
+        for spool_path in self.upload_spool_paths:
+            try:
+                os.unlink(spool_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Failed to remove upload spool file {spool_path}: {str(e)}")
+
+class OutputTail(io.TextIOBase):
+    """
+    Text stream that keeps only the last max_chars characters written to it,
+    so captured script output stays bounded however much is printed
+    """
+    def __init__(self, max_chars=256 * 1024):
+        self.max_chars = max_chars
+        self.chunks = deque()
+        self.size = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, s):
+        self.chunks.append(s)
+        self.size += len(s)
+        # Drop whole chunks from the front while the rest still fills the buffer
+        while self.size - len(self.chunks[0]) >= self.max_chars:
+            self.size -= len(self.chunks.popleft())
+        return len(s)
+    
+    def getvalue(self):
+        """
+        Returns:
+            str: The captured output, starting at the first complete line if older output was dropped
+        """
+        output = ''.join(self.chunks)
+        if len(output) > self.max_chars:
+            output = output[-self.max_chars:]
+            output = output[output.find('\n') + 1:]
+        return output
+
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes with orjson while keeping the default provider's
+    sorted keys, debug-mode indentation and handling of dates and dataclasses
+    """
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+app = Flask(__name__)
+app.request_class = UploadRequest
+if ORJSON_AVAILABLE:
+    app.json = ORJSONProvider(app)
+CORS(app)  # Allow React frontend to make requests
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -37,12 +197,6 @@ def update_user_info():
         if not data or 'email' not in data:
             return jsonify({"error": "Invalid data. 'email' field required"}), 400
         
-        # Get the path to userInfo.json relative to backend
-        # Assuming the file is in src/data/userInfo.json
-        backend_dir = Path(__file__).parent
-        project_root = backend_dir.parent
-        user_info_path = project_root / 'src' / 'data' / 'userInfo.json'
-        
         # Ensure we have both email and role
         user_info = {
             "email": data.get('email', ''),
@@ -53,6 +207,8 @@ def update_user_info():
         with open(user_info_path, 'w') as f:
             json_lib.dump(user_info, f, indent=2)
             f.write('\n')
+        file_stat = user_info_path.stat()
+        user_info_cache[user_info_path] = (file_stat.st_mtime_ns, file_stat.st_size, user_info)
         
         return jsonify({"status": "success", "message": "User info updated successfully", "data": user_info})
     except Exception as e:
@@ -77,9 +233,7 @@ def check_user_connection():
             if not usercheck_path.exists():
                 return jsonify({"error": f"usercheck.py not found at {usercheck_path}"}), 500
             
-            spec = importlib.util.spec_from_file_location("usercheck", usercheck_path)
-            usercheck = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(usercheck)
+            usercheck = load_logics_module("usercheck")
             # Pass force_refresh flag to force fresh authentication
             result = usercheck.check_user_connection(user_email, role, force_refresh=force_refresh)
             
@@ -112,9 +266,7 @@ def get_practice_info():
         if not practice_name_path.exists():
             return jsonify({"error": f"Practice_name.py not found at {practice_name_path}"}), 500
         
-        spec = importlib.util.spec_from_file_location("Practice_name", practice_name_path)
-        practice_name = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(practice_name)
+        practice_name = load_logics_module("Practice_name")
         
         # Get practice display info
         result = practice_name.get_practice_display_info(manual_practice_ids=manual_practice_ids)
@@ -145,9 +297,7 @@ def check_vpn_connection():
             if not fetch_practice_locations_path.exists():
                 return jsonify({"error": f"fetch_practice_locations.py not found at {fetch_practice_locations_path}"}), 500
             
-            spec = importlib.util.spec_from_file_location("fetch_practice_locations", fetch_practice_locations_path)
-            fetch_practice_locations = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(fetch_practice_locations)
+            fetch_practice_locations = load_logics_module("fetch_practice_locations")
             
             # Try to convert the practice ID to cloud ID
             cloud_id_map = fetch_practice_locations.convert_to_cloud_ids([practice_id])
@@ -205,7 +355,7 @@ def convert_mappings():
             return jsonify({"error": "Invalid data. 'mappings' field required"}), 400
         
         try:
-            mappings = json_lib.loads(mappings_json)
+            mappings = app.json.loads(mappings_json)
         except json_lib.JSONDecodeError:
             return jsonify({"error": "Invalid JSON in mappings field"}), 400
         
@@ -213,8 +363,6 @@ def convert_mappings():
             return jsonify({"error": "Mappings must be a non-empty array"}), 400
         
         # Ensure Excel Files directory exists
-        backend_dir = Path(__file__).parent
-        excel_files_dir = backend_dir / 'Excel Files'
         excel_files_dir.mkdir(parents=True, exist_ok=True)
         
         # Save uploaded file as Input.xlsx (always overwrite if exists)
@@ -224,7 +372,15 @@ def convert_mappings():
         if uploaded_file_path.exists():
             os.remove(str(uploaded_file_path))
         
-        file.save(str(uploaded_file_path))
+        # The upload is already on disk in Excel Files (see UploadRequest), so move it into place
+        # rather than copying it; otherwise copy it in 1 MB blocks
+        spool_path = getattr(file.stream, 'name', None)
+        if spool_path in request.upload_spool_paths:
+            # Close it first, as Windows cannot rename an open file
+            file.stream.close()
+            os.replace(spool_path, uploaded_file_path)
+        else:
+            file.save(str(uploaded_file_path), buffer_size=1024 * 1024)
         
         # Import the mappings_raw module
         try:
@@ -233,9 +389,7 @@ def convert_mappings():
             if not mappings_raw_path.exists():
                 return jsonify({"error": f"mappings_raw.py not found at {mappings_raw_path}"}), 500
             
-            spec = importlib.util.spec_from_file_location("mappings_raw", mappings_raw_path)
-            mappings_raw = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(mappings_raw)
+            mappings_raw = load_logics_module("mappings_raw")
             create_mappings_excel = mappings_raw.create_mappings_excel
         except Exception as e:
             return jsonify({"error": f"Failed to import mappings_raw: {str(e)}"}), 500
@@ -252,9 +406,7 @@ def convert_mappings():
             if not create_mapped_path.exists():
                 return jsonify({"error": f"create_mapped.py not found at {create_mapped_path}"}), 500
             
-            spec = importlib.util.spec_from_file_location("create_mapped", create_mapped_path)
-            create_mapped = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(create_mapped)
+            create_mapped = load_logics_module("create_mapped")
             mapped_path = create_mapped.create_mapped_excel()
         except Exception as e:
             return jsonify({"error": f"Failed to create _Mapped.xlsx: {str(e)}"}), 500
@@ -269,9 +421,7 @@ def convert_mappings():
             if not create_locations_input_path.exists():
                 return jsonify({"error": f"create_locations_input.py not found at {create_locations_input_path}"}), 500
             
-            spec = importlib.util.spec_from_file_location("create_locations_input", create_locations_input_path)
-            create_locations_input = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(create_locations_input)
+            create_locations_input = load_logics_module("create_locations_input")
             locations_input_path = create_locations_input.create_locations_input_excel(manual_practice_ids=manual_practice_ids)
         except Exception as e:
             return jsonify({"error": f"Failed to create Locations_input.xlsx: {str(e)}"}), 500
@@ -281,12 +431,10 @@ def convert_mappings():
         npi_extraction_info = None
         try:
             # Read userInfo.json to get email and role for Snowflake connection
-            user_info_path = project_root / 'src' / 'data' / 'userInfo.json'
             if not user_info_path.exists():
                 return jsonify({"error": "userInfo.json not found. Please configure email and role."}), 500
             
-            with open(user_info_path, 'r') as f:
-                user_info = json_lib.load(f)
+            user_info = read_user_info(user_info_path)
             
             user_email = user_info.get('email')
             user_role = user_info.get('role')
@@ -298,9 +446,7 @@ def convert_mappings():
             if not npi_snowflake_path.exists():
                 return jsonify({"error": f"NPIsnowflake.py not found at {npi_snowflake_path}"}), 500
             
-            spec = importlib.util.spec_from_file_location("NPIsnowflake", npi_snowflake_path)
-            npi_snowflake = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(npi_snowflake)
+            npi_snowflake = load_logics_module("NPIsnowflake")
             result = npi_snowflake.create_npi_extracts(user_email, user_role)
             
             # Handle both old return format (string) and new format (tuple)
@@ -347,37 +493,30 @@ def pack_data():
         file_name = data.get('file_name', 'Template copy').strip()
         
         # Sanitize file name (remove invalid characters)
-        import re
-        file_name = re.sub(r'[<>:"/\\|?*]', '', file_name)
+        file_name = INVALID_FILE_NAME_PATTERN.sub('', file_name)
         if not file_name:
             file_name = 'Template copy'
         
         # Import and run main.py from Transposition Logics folder
-        transposition_logics_dir = project_root / 'Transposition Logics'
         main_py_path = transposition_logics_dir / 'main.py'
         
         if not main_py_path.exists():
             return jsonify({"error": f"main.py not found at {main_py_path}"}), 500
         
-        # Add Transposition Logics directory to path for imports
-        sys.path.insert(0, str(transposition_logics_dir))
-        
         # Import and execute main.py
         spec = importlib.util.spec_from_file_location("main", main_py_path)
         main_module = importlib.util.module_from_spec(spec)
         
         # Capture stdout to get print statements
-        import io
         import contextlib
         
-        output_buffer = io.StringIO()
+        output_buffer = OutputTail()
         with contextlib.redirect_stdout(output_buffer):
             spec.loader.exec_module(main_module)
         
         output = output_buffer.getvalue()
         
         # Get the template file path
-        excel_files_dir = backend_dir / 'Excel Files'
         template_path = excel_files_dir / 'Template copy.xlsx'
         
         if not template_path.exists():
@@ -386,12 +525,16 @@ def pack_data():
         # Rename the file if a different name was provided
         final_template_path = template_path
         if file_name != 'Template copy':
-            final_template_path = excel_files_dir / f'{file_name}.xlsx'
+            # List the existing names once (case-insensitively, like Windows and macOS file systems)
+            with os.scandir(excel_files_dir) as entries:
+                existing_names = {entry.name.casefold() for entry in entries}
+            final_file_name = f'{file_name}.xlsx'
             # If file with same name exists, add a number suffix
             counter = 1
-            while final_template_path.exists():
-                final_template_path = excel_files_dir / f'{file_name} ({counter}).xlsx'
+            while final_file_name.casefold() in existing_names:
+                final_file_name = f'{file_name} ({counter}).xlsx'
                 counter += 1
+            final_template_path = excel_files_dir / final_file_name
             template_path.rename(final_template_path)
         
         return jsonify({
@@ -429,8 +572,8 @@ def open_file_explorer():
         
         # Open file explorer based on OS
         if platform.system() == 'Windows':
-            # Windows: use explorer.exe
-            subprocess.Popen(f'explorer /select,"{file_path_obj}"')
+            # Windows: use explorer.exe, passing the path as its own argument so subprocess quotes it
+            subprocess.Popen(['explorer', '/select,', str(file_path_obj)])
         elif platform.system() == 'Darwin':  # macOS
             # macOS: use open command
             subprocess.Popen(['open', '-R', str(file_path_obj)])
@@ -460,8 +603,7 @@ def check_file_exists():
         if not file_path:
             return jsonify({"error": "File path is required"}), 400
         
-        file_path_obj = Path(file_path)
-        exists = file_path_obj.exists()
+        exists = os.path.exists(file_path)
         
         return jsonify({
             "status": "success",
@@ -476,9 +618,6 @@ def check_file_exists():
 def delete_excel_files():
     """Delete all Excel files in the backend/Excel Files directory"""
     try:
-        backend_dir = Path(__file__).parent
-        excel_files_dir = backend_dir / 'Excel Files'
-        
         if not excel_files_dir.exists():
             return jsonify({
                 "status": "success",
@@ -486,21 +625,31 @@ def delete_excel_files():
                 "deleted_count": 0
             })
         
-        # Find all Excel files (.xlsx, .xls)
-        excel_extensions = ['.xlsx', '.xls']
+        # Find all Excel files (.xlsx, .xls), using the file type scandir already read for each entry
+        excel_extensions = ('.xlsx', '.xls')
         deleted_files = []
         deleted_count = 0
         
-        for file_path in excel_files_dir.iterdir():
-            if file_path.is_file() and file_path.suffix.lower() in excel_extensions:
-                try:
-                    file_path.unlink()
-                    deleted_files.append(file_path.name)
-                    deleted_count += 1
-                except Exception as e:
-                    return jsonify({
-                        "error": f"Failed to delete {file_path.name}: {str(e)}"
-                    }), 500
+        with os.scandir(excel_files_dir) as entries:
+            for entry in entries:
+                extension = os.path.splitext(entry.name)[1].lower()
+                # Also sweep upload spool files left behind by a crashed /api/convert
+                # (one still in use by a running upload may not be removable, so skip it)
+                if extension == UPLOAD_SPOOL_SUFFIX and entry.is_file():
+                    try:
+                        os.unlink(entry.path)
+                    except OSError:
+                        pass
+                    continue
+                if extension in excel_extensions and entry.is_file():
+                    try:
+                        os.unlink(entry.path)
+                        deleted_files.append(entry.name)
+                        deleted_count += 1
+                    except Exception as e:
+                        return jsonify({
+                            "error": f"Failed to delete {entry.name}: {str(e)}"
+                        }), 500
         
         return jsonify({
             "status": "success",
@@ -520,5 +669,7 @@ def delete_excel_files():
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    # Run with the reloader and debugger only when DEBUG is set in backend/.env
+    debug = os.environ.get('DEBUG', '').strip().lower() in ('1', 'true')
+    app.run(host='0.0.0.0', port=port, debug=debug)
 
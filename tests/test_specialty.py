@@ -0,0 +1,142 @@
+"""
+Tests for specialty.read_excel_column, which must line up with pandas.read_excel row for row.
+"""
+
+import importlib.machinery
+import importlib.util
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'Transposition Logics'))
+
+import specialty
+
+# Sheet rows (None = empty cell) for each case
+SHEETS = {
+    'internal_blank_rows': [
+        ['NPI', 'Specialty'],
+        [1, 'Cardiology'],
+        [None, None],
+        [None, None],
+        [None, None],
+        [2, 'Dermatology'],
+    ],
+    'trailing_blank_rows': [
+        ['NPI', 'Specialty'],
+        [1, 'Cardiology'],
+        [None, None],
+        [None, ''],
+    ],
+    'empty_strings': [
+        ['NPI', 'Specialty'],
+        [1, 'Cardiology'],
+        ['', ''],
+        [2, 'Dermatology'],
+    ],
+    'na_strings': [
+        ['NPI', 'Specialty'],
+        [1, 'NA'],
+        ['N/A', 'null'],
+        [2, 'Dermatology'],
+    ],
+    'data_in_other_columns': [
+        ['NPI', 'Specialty', 'Notes'],
+        [None, None, 'first'],
+        [1, 'Cardiology', None],
+        [None, None, None],
+        [None, None, 'last'],
+    ],
+    'blank_first_row': [
+        [None, None],
+        ['NPI', 'Specialty'],
+        [1, 'Cardiology'],
+    ],
+}
+
+
+def write_sheet(path, rows):
+    """Write rows to the first sheet of a new workbook at path."""
+    wb = Workbook()
+    sheet = wb.active
+    for row_idx, row in enumerate(rows, start=1):
+        for col_idx, value in enumerate(row, start=1):
+            if value is not None:
+                sheet.cell(row=row_idx, column=col_idx, value=value)
+    wb.save(path)
+
+
+def pandas_column(path, column_name):
+    """The column as the old pd.read_excel reads returned it, with NaN as None (None if missing)."""
+    df = pd.read_excel(path)
+    if column_name not in df.columns:
+        return None
+    column = df[column_name]
+    return column.astype(object).where(column.notna(), None).tolist()
+
+
+@pytest.fixture(params=['openpyxl', 'calamine'])
+def reader_engine(request, monkeypatch):
+    if request.param == 'calamine' and not specialty.calamine_engine_available():
+        pytest.skip('python-calamine is not installed or pandas has no calamine engine')
+    monkeypatch.setattr(specialty, 'CALAMINE_AVAILABLE', request.param == 'calamine')
+    return request.param
+
+
+@pytest.mark.parametrize('case', sorted(SHEETS))
+def test_read_excel_column_matches_pandas(tmp_path, reader_engine, case):
+    path = tmp_path / f'{case}.xlsx'
+    write_sheet(path, SHEETS[case])
+
+    assert specialty.read_excel_column(path, 'Specialty') == pandas_column(path, 'Specialty')
+
+
+def test_read_excel_column_keeps_internal_blank_rows(tmp_path, reader_engine):
+    path = tmp_path / 'internal_blank_rows.xlsx'
+    write_sheet(path, SHEETS['internal_blank_rows'])
+
+    assert specialty.read_excel_column(path, 'Specialty') == ['Cardiology', None, None, None, 'Dermatology']
+
+
+def test_read_excel_column_missing_column(tmp_path, reader_engine):
+    path = tmp_path / 'internal_blank_rows.xlsx'
+    write_sheet(path, SHEETS['internal_blank_rows'])
+
+    assert specialty.read_excel_column(path, 'Specialty Derived') is None
+
+
+@pytest.fixture
+def calamine_installed(monkeypatch):
+    """Make the python-calamine probe succeed whether or not it is installed."""
+    find_spec = importlib.util.find_spec
+
+    def fake_find_spec(name, *args, **kwargs):
+        if name == 'python_calamine':
+            return importlib.machinery.ModuleSpec(name, None)
+        return find_spec(name, *args, **kwargs)
+
+    monkeypatch.setattr(importlib.util, 'find_spec', fake_find_spec)
+
+
+@pytest.mark.parametrize('pandas_version, expected', [
+    ('2.1.4', False),
+    ('2.2.0', True),
+    ('3.0.6', True),
+])
+def test_calamine_engine_needs_pandas_2_2(monkeypatch, calamine_installed, pandas_version, expected):
+    monkeypatch.setattr(specialty.pd, '__version__', pandas_version)
+
+    assert specialty.calamine_engine_available() is expected
+
+
+def test_read_excel_column_with_calamine_on_pandas_without_engine(tmp_path, monkeypatch, calamine_installed):
+    # The pinned pandas 2.1.4 has no calamine engine, so python-calamine being installed must not select it
+    monkeypatch.setattr(specialty.pd, '__version__', '2.1.4')
+    monkeypatch.setattr(specialty, 'CALAMINE_AVAILABLE', specialty.calamine_engine_available())
+    path = tmp_path / 'internal_blank_rows.xlsx'
+    write_sheet(path, SHEETS['internal_blank_rows'])
+
+    assert specialty.read_excel_column(path, 'Specialty') == ['Cardiology', None, None, None, 'Dermatology']